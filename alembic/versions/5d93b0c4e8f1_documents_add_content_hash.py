@@ -0,0 +1,28 @@
+"""documents add content_hash
+
+Revision ID: 5d93b0c4e8f1
+Revises: e2b8d4f61a57
+Create Date: 2026-03-12 11:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d93b0c4e8f1"
+down_revision: Union[str, None] = "e2b8d4f61a57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.create_index(op.f("ix_documents_content_hash"), "documents", ["content_hash"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_documents_content_hash"), table_name="documents")
+    op.drop_column("documents", "content_hash")
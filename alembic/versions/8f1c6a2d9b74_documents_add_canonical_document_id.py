@@ -0,0 +1,41 @@
+"""documents add canonical_document_id
+
+Revision ID: 8f1c6a2d9b74
+Revises: 5d93b0c4e8f1
+Create Date: 2026-03-12 15:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8f1c6a2d9b74"
+down_revision: Union[str, None] = "5d93b0c4e8f1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("canonical_document_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "fk_documents_canonical_document_id",
+        "documents",
+        "documents",
+        ["canonical_document_id"],
+        ["id"],
+    )
+    op.create_index(
+        op.f("ix_documents_canonical_document_id"),
+        "documents",
+        ["canonical_document_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_documents_canonical_document_id"), table_name="documents")
+    op.drop_constraint("fk_documents_canonical_document_id", "documents", type_="foreignkey")
+    op.drop_column("documents", "canonical_document_id")
@@ -0,0 +1,26 @@
+"""documents add parse_started_at
+
+Revision ID: 9c2d7e4b1a83
+Revises: f4a81c3d6e29
+Create Date: 2026-10-17 10:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c2d7e4b1a83"
+down_revision: Union[str, None] = "f4a81c3d6e29"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("parse_started_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("documents", "parse_started_at")
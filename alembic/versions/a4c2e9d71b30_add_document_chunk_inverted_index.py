@@ -0,0 +1,65 @@
+"""add document chunk inverted index
+
+Revision ID: a4c2e9d71b30
+Revises: 71e9f5f8c2a1
+Create Date: 2026-03-09 14:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4c2e9d71b30"
+down_revision: Union[str, None] = "71e9f5f8c2a1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "document_chunks",
+        sa.Column("term_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    op.create_table(
+        "document_chunk_terms",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("workspace_id", sa.Integer(), nullable=False),
+        sa.Column("document_id", sa.Integer(), nullable=False),
+        sa.Column("chunk_id", sa.Integer(), nullable=False),
+        sa.Column("term", sa.String(length=64), nullable=False),
+        sa.Column("term_freq", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["chunk_id"], ["document_chunks.id"]),
+        sa.ForeignKeyConstraint(["document_id"], ["documents.id"]),
+        sa.ForeignKeyConstraint(["workspace_id"], ["workspaces.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_document_chunk_terms_workspace_term",
+        "document_chunk_terms",
+        ["workspace_id", "term"],
+        unique=False,
+    )
+    op.create_index(op.f("ix_document_chunk_terms_document_id"), "document_chunk_terms", ["document_id"], unique=False)
+    op.create_index(op.f("ix_document_chunk_terms_chunk_id"), "document_chunk_terms", ["chunk_id"], unique=False)
+
+    op.create_table(
+        "workspace_search_stats",
+        sa.Column("workspace_id", sa.Integer(), nullable=False),
+        sa.Column("chunk_count", sa.Integer(), nullable=False),
+        sa.Column("term_total", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["workspace_id"], ["workspaces.id"]),
+        sa.PrimaryKeyConstraint("workspace_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("workspace_search_stats")
+    op.drop_index(op.f("ix_document_chunk_terms_chunk_id"), table_name="document_chunk_terms")
+    op.drop_index(op.f("ix_document_chunk_terms_document_id"), table_name="document_chunk_terms")
+    op.drop_index("ix_document_chunk_terms_workspace_term", table_name="document_chunk_terms")
+    op.drop_table("document_chunk_terms")
+    op.drop_column("document_chunks", "term_count")
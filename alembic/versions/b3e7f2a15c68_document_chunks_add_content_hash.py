@@ -0,0 +1,26 @@
+"""document_chunks add content_hash
+
+Revision ID: b3e7f2a15c68
+Revises: 8f1c6a2d9b74
+Create Date: 2026-03-14 10:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b3e7f2a15c68"
+down_revision: Union[str, None] = "8f1c6a2d9b74"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("document_chunks", sa.Column("content_hash", sa.String(length=40), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("document_chunks", "content_hash")
@@ -0,0 +1,62 @@
+"""intern search terms
+
+Revision ID: c7f05a3e92d4
+Revises: a4c2e9d71b30
+Create Date: 2026-03-10 09:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7f05a3e92d4"
+down_revision: Union[str, None] = "a4c2e9d71b30"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "search_terms",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("term", sa.String(length=64), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("term"),
+    )
+
+    # Postings are derived data: drop them and let reindex rebuild them with interned ids.
+    op.execute("DELETE FROM document_chunk_terms")
+    op.drop_index("ix_document_chunk_terms_workspace_term", table_name="document_chunk_terms")
+    op.drop_column("document_chunk_terms", "term")
+    op.add_column("document_chunk_terms", sa.Column("term_id", sa.Integer(), nullable=False))
+    op.create_foreign_key(
+        "fk_document_chunk_terms_term_id",
+        "document_chunk_terms",
+        "search_terms",
+        ["term_id"],
+        ["id"],
+    )
+    op.create_index(
+        "ix_document_chunk_terms_workspace_term",
+        "document_chunk_terms",
+        ["workspace_id", "term_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM document_chunk_terms")
+    op.drop_index("ix_document_chunk_terms_workspace_term", table_name="document_chunk_terms")
+    op.drop_constraint("fk_document_chunk_terms_term_id", "document_chunk_terms", type_="foreignkey")
+    op.drop_column("document_chunk_terms", "term_id")
+    op.add_column("document_chunk_terms", sa.Column("term", sa.String(length=64), nullable=False))
+    op.create_index(
+        "ix_document_chunk_terms_workspace_term",
+        "document_chunk_terms",
+        ["workspace_id", "term"],
+        unique=False,
+    )
+    op.drop_table("search_terms")
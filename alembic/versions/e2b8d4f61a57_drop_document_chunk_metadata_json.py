@@ -0,0 +1,27 @@
+"""drop document chunk metadata_json
+
+Revision ID: e2b8d4f61a57
+Revises: c7f05a3e92d4
+Create Date: 2026-03-11 16:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b8d4f61a57"
+down_revision: Union[str, None] = "c7f05a3e92d4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # workspace_id / document_id / source / filename are read from documents at query time.
+    op.drop_column("document_chunks", "metadata_json")
+
+
+def downgrade() -> None:
+    op.add_column("document_chunks", sa.Column("metadata_json", sa.JSON(), nullable=True))
@@ -0,0 +1,28 @@
+"""document_chunks add start_offset and end_offset
+
+Revision ID: f4a81c3d6e29
+Revises: b3e7f2a15c68
+Create Date: 2026-03-16 09:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f4a81c3d6e29"
+down_revision: Union[str, None] = "b3e7f2a15c68"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("document_chunks", sa.Column("start_offset", sa.Integer(), nullable=True))
+    op.add_column("document_chunks", sa.Column("end_offset", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("document_chunks", "end_offset")
+    op.drop_column("document_chunks", "start_offset")
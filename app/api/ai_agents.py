@@ -1,18 +1,17 @@
-from datetime import datetime, timezone
-
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response, status
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.deps import get_current_user
-from app.core.logging import new_trace_id
 from app.db.session import get_db
-from app.models.agent_run import AgentMessage, AgentMessageRole, AgentRun, AgentRunStatus
+from app.models.agent_run import AgentMessage, AgentRun, AgentRunStatus
 from app.models.user import User
 from app.schemas.ai_agent import AgentRunCreateIn, AgentRunOut, AgentToolCallOut
-from app.services.agents.graph import run_controlled_agent
+from app.services.agents.runs import AGENT_LLM_CALLS, create_agent_run_record, execute_agent_run
+from app.services.jobs.agent_runs import enqueue_agent_run
+from app.services.llm.scheduler import estimate_request_tokens, fair_share_slot
 from app.services.projects import get_project_and_require_role
 from app.models.workspace import WorkspaceRole
-from app.services.audit import write_audit
 
 router = APIRouter(tags=["ai-agents"])
 
@@ -50,88 +49,37 @@ def _serialize_run(run: AgentRun, messages: list[AgentMessage]) -> AgentRunOut:
 def create_agent_run(
     project_id: int,
     payload: AgentRunCreateIn,
+    response: Response,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
     project = get_project_and_require_role(project_id, WorkspaceRole.MEMBER, db, user)
-    trace_id = new_trace_id()
-    run = AgentRun(
-        workspace_id=project.workspace_id,
-        project_id=project_id,
-        triggered_by=user.id,
-        goal=payload.goal,
-        status=AgentRunStatus.RUNNING,
-        trace_id=trace_id,
-        started_at=datetime.now(timezone.utc),
-    )
-    db.add(run)
-    db.commit()
-    db.refresh(run)
-
-    db.add(
-        AgentMessage(
-            run_id=run.id,
-            role=AgentMessageRole.USER,
-            content=payload.goal,
-            step_index=0,
-        )
-    )
-    db.commit()
-
-    try:
-        tool_outputs, final_output = run_controlled_agent(
-            db=db,
+    if settings.ai_async_agent_runs:
+        # Only the PENDING row is written here; the agent-run worker executes it and clients poll the run.
+        run = create_agent_run_record(
+            db,
             workspace_id=project.workspace_id,
             project_id=project_id,
+            user_id=user.id,
             goal=payload.goal,
+            status=AgentRunStatus.PENDING,
         )
-        for index, output in enumerate(tool_outputs, start=1):
-            db.add(
-                AgentMessage(
-                    run_id=run.id,
-                    role=AgentMessageRole.TOOL,
-                    content=output["summary"],
-                    tool_name=output["tool_name"],
-                    step_index=index,
-                    tool_input_json={"goal": payload.goal, "project_id": project_id},
-                    tool_output_json=output,
-                )
+        enqueue_agent_run(run.id)
+        response.status_code = status.HTTP_202_ACCEPTED
+    else:
+        # A run makes up to AGENT_LLM_CALLS model calls, so it is charged for all of them up front.
+        with fair_share_slot(
+            project.workspace_id, estimate_request_tokens(payload.goal, llm_calls=AGENT_LLM_CALLS)
+        ):
+            run = create_agent_run_record(
+                db,
+                workspace_id=project.workspace_id,
+                project_id=project_id,
+                user_id=user.id,
+                goal=payload.goal,
+                status=AgentRunStatus.RUNNING,
             )
-
-        db.add(
-            AgentMessage(
-                run_id=run.id,
-                role=AgentMessageRole.ASSISTANT,
-                content=final_output,
-                step_index=len(tool_outputs) + 1,
-            )
-        )
-        db.commit()
-
-        audit_log = write_audit(
-            db=db,
-            workspace_id=project.workspace_id,
-            actor_id=user.id,
-            action="AGENT_RUN_EXECUTE",
-            entity_type="agent_run",
-            entity_id=run.id,
-            meta={"trace_id": trace_id, "project_id": project_id, "steps": len(tool_outputs)},
-        )
-        db.commit()
-        db.refresh(audit_log)
-
-        run.status = AgentRunStatus.SUCCESS
-        run.final_output = final_output
-        run.audit_log_id = audit_log.id
-        run.finished_at = datetime.now(timezone.utc)
-        db.commit()
-        db.refresh(run)
-    except Exception as exc:
-        run.status = AgentRunStatus.FAILED
-        run.error_message = str(exc)
-        run.finished_at = datetime.now(timezone.utc)
-        db.commit()
-        db.refresh(run)
+            run = execute_agent_run(db, run)
 
     messages = (
         db.query(AgentMessage)
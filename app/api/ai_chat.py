@@ -1,5 +1,10 @@
-from fastapi import APIRouter, Depends
+import json
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
 
 from app.core.deps import get_current_user
 from app.core.logging import new_trace_id
@@ -11,12 +16,35 @@ from app.models.workspace import WorkspaceRole
 from app.schemas.ai_chat import ChatRequestIn, ChatResponseOut
 from app.schemas.ai_document import RetrievedChunkOut
 from app.services.llm.client import get_llm_provider
+from app.services.llm.http import LLMProviderError
+from app.services.llm.scheduler import acquire_ai_slot, estimate_request_tokens, fair_share_slot, release_ai_slot
 from app.services.rag.citations import build_citations
+from app.services.rag.context import pack_contexts
 from app.services.rag.retriever import retrieve_workspace_chunks
 
 router = APIRouter(tags=["ai-chat"])
 
 
+def _retrieved_chunks(chunks: list[dict]) -> list[RetrievedChunkOut]:
+    return [
+        RetrievedChunkOut(
+            chunk_id=item["chunk_id"],
+            document_id=item["document_id"],
+            filename=item["filename"],
+            content=item["content"],
+            start_offset=item.get("start_offset"),
+            end_offset=item.get("end_offset"),
+            score=item["score"],
+            metadata=item["metadata"],
+        )
+        for item in chunks
+    ]
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @router.post("/workspaces/{workspace_id}/ai/chat", response_model=ChatResponseOut)
 def workspace_ai_chat(
     workspace_id: int,
@@ -28,8 +56,13 @@ def workspace_ai_chat(
     trace_id = new_trace_id()
     top_k = max(1, min(payload.top_k, 10))
     chunks = retrieve_workspace_chunks(db, workspace_id, payload.question, top_k=top_k)
-    provider = get_llm_provider()
-    answer = provider.generate_answer(payload.question, chunks)
+    provider = get_llm_provider(workspace_id)
+    # The prompt gets a deduplicated, token-budgeted context; citations still list every retrieved chunk.
+    try:
+        with fair_share_slot(workspace_id, estimate_request_tokens(payload.question)):
+            answer = provider.generate_answer(payload.question, pack_contexts(chunks))
+    except LLMProviderError as exc:
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
     metrics.incr("ai_chat_requests")
     if chunks:
         metrics.incr("ai_chat_hits")
@@ -37,16 +70,62 @@ def workspace_ai_chat(
     return ChatResponseOut(
         answer=answer,
         citations=build_citations(chunks),
-        retrieved_chunks=[
-            RetrievedChunkOut(
-                chunk_id=item["chunk_id"],
-                document_id=item["document_id"],
-                filename=item["filename"],
-                content=item["content"],
-                score=item["score"],
-                metadata=item["metadata"],
-            )
-            for item in chunks
-        ],
+        retrieved_chunks=_retrieved_chunks(chunks),
         trace_id=trace_id,
     )
+
+
+@router.post("/workspaces/{workspace_id}/ai/chat/stream")
+async def workspace_ai_chat_stream(
+    workspace_id: int,
+    payload: ChatRequestIn,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    # Retrieval and RBAC use the sync session, so they run in the threadpool before streaming starts.
+    _ = await run_in_threadpool(require_role, workspace_id, WorkspaceRole.GUEST, db, user)
+    trace_id = new_trace_id()
+    top_k = max(1, min(payload.top_k, 10))
+    chunks = await run_in_threadpool(retrieve_workspace_chunks, db, workspace_id, payload.question, top_k=top_k)
+    provider = get_llm_provider(workspace_id)
+    # Admission happens before the response starts, so a throttled request still gets a plain 429.
+    slot = await run_in_threadpool(acquire_ai_slot, workspace_id, estimate_request_tokens(payload.question))
+    metrics.incr("ai_chat_requests")
+    if chunks:
+        metrics.incr("ai_chat_hits")
+
+    released = False
+
+    async def release() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            await run_in_threadpool(release_ai_slot, workspace_id, slot)
+
+    async def events():
+        try:
+            # Citations go out first, so clients can render sources while the answer is still generating.
+            yield _sse(
+                "context",
+                {
+                    "citations": [citation.model_dump() for citation in build_citations(chunks)],
+                    "retrieved_chunks": [chunk.model_dump() for chunk in _retrieved_chunks(chunks)],
+                },
+            )
+            try:
+                async for token in provider.stream_answer(payload.question, pack_contexts(chunks)):
+                    yield _sse("token", {"text": token})
+            except LLMProviderError as exc:
+                yield _sse("error", {"detail": str(exc)})
+            yield _sse("done", {"trace_id": trace_id})
+        finally:
+            await release()
+
+    # The background task also runs when the client went away before the body started, when the
+    # generator's finally never does.
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        background=BackgroundTask(release),
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+import io
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.deps import get_current_user
 from app.core.rbac import require_role
 from app.db.session import get_db
-from app.models.document import Document
+from app.models.document import Document, DocumentSourceType, DocumentStatus
 from app.models.user import User
 from app.models.workspace import WorkspaceRole
 from app.schemas.ai_document import DocumentOut
 from app.services.audit import write_audit
-from app.services.rag.ingest import create_manual_document, create_uploaded_document
+from app.services.jobs.document_ingest import enqueue_document_ingest
+from app.services.rag.ingest import (
+    create_manual_document,
+    create_pending_document,
+    create_uploaded_document,
+    store_upload_stream,
+)
 
 router = APIRouter(tags=["ai-documents"])
 
@@ -25,6 +35,7 @@ def _serialize_document(document: Document) -> DocumentOut:
         source_type=document.source_type.value,
         status=document.status.value,
         chunk_count=document.chunk_count,
+        duplicate_of=document.canonical_document_id,
         error_message=document.error_message,
         created_at=document.created_at,
     )
@@ -33,6 +44,7 @@ def _serialize_document(document: Document) -> DocumentOut:
 @router.post("/workspaces/{workspace_id}/documents", response_model=DocumentOut, status_code=201)
 async def upload_document(
     workspace_id: int,
+    response: Response,
     file: UploadFile | None = File(default=None),
     content: str | None = Form(default=None),
     filename: str | None = Form(default=None),
@@ -45,18 +57,46 @@ async def upload_document(
     if file is None and not content:
         raise HTTPException(status_code=400, detail="Provide either a file upload or manual content")
 
-    if file is not None:
-        raw = await file.read()
-        document = create_uploaded_document(
+    if settings.ai_async_ingest:
+        # Only persist the bytes here; the ingest worker does PARSING -> INDEXED and clients poll the status.
+        if file is not None:
+            source = file.file
+            source_type = DocumentSourceType.UPLOAD
+            name = file.filename or "uploaded.txt"
+            mime = file.content_type or "application/octet-stream"
+        else:
+            source = io.BytesIO((content or "").encode("utf-8"))
+            source_type = DocumentSourceType.MANUAL
+            name = filename or "manual-note.txt"
+            mime = content_type or "text/plain"
+        blob = await run_in_threadpool(store_upload_stream, source, name)
+        document = await run_in_threadpool(
+            create_pending_document,
+            db,
+            workspace_id=workspace_id,
+            user_id=user.id,
+            filename=name,
+            blob=blob,
+            content_type=mime,
+            source_type=source_type,
+        )
+        if document.status == DocumentStatus.PENDING:
+            response.status_code = status.HTTP_202_ACCEPTED
+    elif file is not None:
+        # The upload is copied to disk block by block and chunked straight from the stored file.
+        document = await run_in_threadpool(
+            create_uploaded_document,
             db,
             workspace_id=workspace_id,
             user_id=user.id,
             filename=file.filename or "uploaded.txt",
-            content=raw,
+            source=file.file,
             content_type=file.content_type or "application/octet-stream",
         )
     else:
-        document = create_manual_document(
+        # Chunking, embedding and the vector-store lock all block, so they stay off the event loop too.
+        document = await run_in_threadpool(
+            create_manual_document,
             db,
             workspace_id=workspace_id,
             user_id=user.id,
@@ -75,6 +115,8 @@ async def upload_document(
         meta={"filename": document.filename, "status": document.status.value},
     )
     db.commit()
+    if document.status == DocumentStatus.PENDING:
+        enqueue_document_ingest(document.id)
     return _serialize_document(document)
 
 
@@ -91,3 +133,22 @@ def list_documents(
         .order_by(Document.id.desc())
     ).scalars().all()
     return [_serialize_document(document) for document in rows]
+
+
+@router.get("/workspaces/{workspace_id}/documents/{document_id}", response_model=DocumentOut)
+def get_document(
+    workspace_id: int,
+    document_id: int,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    _ = require_role(workspace_id, WorkspaceRole.GUEST, db, user)
+    document = db.execute(
+        select(Document).where(
+            Document.id == document_id,
+            Document.workspace_id == workspace_id,
+        )
+    ).scalar_one_or_none()
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return _serialize_document(document)
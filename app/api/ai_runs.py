@@ -1,17 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import time
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.deps import get_current_user
 from app.db.session import get_db
-from app.models.agent_run import AgentMessage, AgentRun
+from app.models.agent_run import AgentMessage, AgentRun, AgentRunStatus
 from app.models.user import User
 from app.models.workspace import WorkspaceRole
 from app.schemas.ai_agent import AgentRunOut, AgentToolCallOut
+from app.services.agents.events import TERMINAL_EVENTS, stream_run_events
 from app.services.projects import get_project_and_require_role
 
 router = APIRouter(tags=["ai-runs"])
 
+FINISHED_STATUSES = {AgentRunStatus.SUCCESS, AgentRunStatus.FAILED}
+
+
+def _load_run(run_id: int, db: Session, user: User) -> AgentRun:
+    run = db.execute(select(AgentRun).where(AgentRun.id == run_id)).scalar_one_or_none()
+    if not run:
+        raise HTTPException(status_code=404, detail="Agent run not found")
+
+    _ = get_project_and_require_role(run.project_id, WorkspaceRole.GUEST, db, user)
+    return run
+
+
+def _fetch_run(db: Session, run_id: int) -> AgentRun | None:
+    # One short transaction per check, so a long-lived stream does not pin a pooled connection.
+    try:
+        return db.get(AgentRun, run_id)
+    finally:
+        db.close()
+
+
+def _run_event(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+
+
+def _finished_event(run: AgentRun) -> str:
+    data = {"status": run.status.value, "error_message": run.error_message, "audit_ref": run.audit_log_id}
+    return f"event: run_finished\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _timeout_event(run: AgentRun | None) -> str:
+    data = {"status": run.status.value if run is not None else None}
+    return f"event: stream_timeout\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 
 @router.get("/agent-runs/{run_id}", response_model=AgentRunOut)
 def get_agent_run(
@@ -19,11 +59,7 @@ def get_agent_run(
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    run = db.execute(select(AgentRun).where(AgentRun.id == run_id)).scalar_one_or_none()
-    if not run:
-        raise HTTPException(status_code=404, detail="Agent run not found")
-
-    _ = get_project_and_require_role(run.project_id, WorkspaceRole.GUEST, db, user)
+    run = _load_run(run_id, db, user)
     messages = (
         db.query(AgentMessage)
         .filter(AgentMessage.run_id == run.id)
@@ -56,3 +92,49 @@ def get_agent_run(
         finished_at=run.finished_at,
         created_at=run.created_at,
     )
+
+
+@router.get("/agent-runs/{run_id}/events")
+async def stream_agent_run_events(
+    run_id: int,
+    request: Request,
+    after: int = Query(default=0, ge=0),
+    last_event_id: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    run = await run_in_threadpool(_load_run, run_id, db, user)
+    await run_in_threadpool(db.close)
+    # EventSource reconnects send Last-Event-ID; ?after= lets other clients resume from a known step.
+    after_seq = max(after, int(last_event_id)) if last_event_id and last_event_id.isdigit() else after
+    finished = run.status in FINISHED_STATUSES
+
+    async def events():
+        # A finished run only replays its log; a live one is followed until its run_finished event, or until
+        # AI_AGENT_RUN_STREAM_TIMEOUT_SECONDS pass, after which the client reconnects with Last-Event-ID.
+        deadline = time.monotonic() + settings.ai_agent_run_stream_timeout_seconds
+        async for event in stream_run_events(run_id, after_seq, follow=not finished):
+            if event is not None:
+                yield _run_event(event)
+                if event["event"] in TERMINAL_EVENTS:
+                    return
+                continue
+            if await request.is_disconnected():
+                return
+            # Quiet for a while: ping, and close from the database if the run ended without its final event.
+            current = await run_in_threadpool(_fetch_run, db, run_id)
+            if current is not None and current.status in FINISHED_STATUSES:
+                yield _finished_event(current)
+                return
+            if time.monotonic() >= deadline:
+                yield _timeout_event(current)
+                return
+            yield ": keepalive\n\n"
+        # Event log expired or the run predates it: the stored status still ends the stream.
+        yield _finished_event(run)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,4 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from app.core.deps import get_current_user
+from app.core.telemetry import metrics
+from app.models.user import User
 
 router = APIRouter()
 
@@ -6,3 +10,9 @@ router = APIRouter()
 @router.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@router.get("/health/llm")
+def llm_health(user: User = Depends(get_current_user)):
+    # Per-backend latency reveals the provider topology, so it is only shown to signed-in users.
+    return {"latency": metrics.histogram_snapshot("llm_latency:")}
@@ -22,6 +22,8 @@ from app.services.projects import get_project_and_require_role
 from app.services.cache import cache_delete, dashboard_key
 from app.services.audit import write_audit
 from app.services.tools.create_task_draft import create_task_draft
+from app.services.llm.http import LLMProviderError
+from app.services.llm.scheduler import estimate_request_tokens, fair_share_slot
 
 router = APIRouter(tags=["tasks"])
 
@@ -223,13 +225,17 @@ def generate_task_draft(
 ):
     project = get_project_and_require_role(project_id, WorkspaceRole.MEMBER, db, user)
     trace_id = new_trace_id()
-    result = create_task_draft(
-        db,
-        workspace_id=project.workspace_id,
-        project_id=project_id,
-        requirement=payload.requirement,
-        document_ids=payload.document_ids,
-    )
+    try:
+        with fair_share_slot(project.workspace_id, estimate_request_tokens(payload.requirement)):
+            result = create_task_draft(
+                db,
+                workspace_id=project.workspace_id,
+                project_id=project_id,
+                requirement=payload.requirement,
+                document_ids=payload.document_ids,
+            )
+    except LLMProviderError as exc:
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
     write_audit(
         db=db,
         workspace_id=project.workspace_id,
@@ -19,13 +19,79 @@ class Settings(BaseSettings):
     jwt_secret: str = "jofeswfoi"
     jwt_alg: str = "HS256"
     ai_storage_dir: str = "data/uploads"
-    ai_chunk_size: int = 700
-    ai_chunk_overlap: int = 100
+    ai_chunk_chars: int = 800
+    ai_chunk_overlap_chars: int = 100
+    ai_ingest_batch_size: int = 500
+    ai_async_ingest: bool = False
+    ai_ingest_parse_lease_seconds: int = 900
+    ai_async_agent_runs: bool = False
+    ai_agent_run_workers: int = 4
+    ai_agent_event_log_max: int = 500
+    ai_agent_event_ttl_seconds: int = 86400
+    ai_agent_run_stream_timeout_seconds: int = 1800
+    ai_agent_run_lease_seconds: int = 1800
+    ai_worker_heartbeat_ttl_seconds: int = 90
+    ai_worker_reap_interval_seconds: int = 30
+    ai_worker_orphan_grace_seconds: int = 120
+    ai_upload_block_size: int = 1024 * 1024
     ai_retrieval_top_k: int = 5
+    ai_retrieval_stream_batch: int = 1000
+    ai_retrieval_mode: str = "lexical"
+    ai_hybrid_candidate_pool: int = 20
+    ai_hybrid_rrf_k: int = 60
+    ai_hybrid_lexical_weight: float = 1.0
+    ai_hybrid_vector_weight: float = 1.0
+    ai_retrieval_cache_ttl_seconds: int = 86400
+    ai_retrieval_cache_local_size: int = 1024
+    ai_embedding_backend: str = "hashing"
+    ai_embedding_dim: int = 384
+    ai_embedding_batch_size: int = 256
+    ai_ann_min_vectors: int = 100_000
+    ai_ann_nprobe: int = 8
+    ai_vector_compact_ratio: float = 0.25
+    ai_reindex_workers: int = 0
+    ai_reindex_pause_ms: int = 20
+    ai_context_token_budget: int = 1500
+    ai_tokenizer_encoding: str = "o200k_base"
+    ai_parser_workers: int = 2
+    ai_parser_timeout_seconds: int = 60
+    ai_parser_memory_mb: int = 1024
+    ai_parser_queue_timeout_seconds: float = 30.0
     llm_provider: str = "deterministic"
     llm_api_key: str | None = None
     llm_base_url: str | None = None
     llm_model: str = "gpt-4o-mini"
+    llm_temperature: float = 0.2
+    llm_http2: bool = True
+    llm_max_connections: int = 20
+    llm_max_keepalive_connections: int = 10
+    llm_keepalive_expiry_seconds: float = 30.0
+    llm_connect_timeout_seconds: float = 5.0
+    llm_read_timeout_seconds: float = 60.0
+    llm_max_retries: int = 3
+    llm_retry_backoff_seconds: float = 0.5
+    llm_retry_backoff_max_seconds: float = 8.0
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 86400
+    llm_cache_max_entries: int = 10000
+    llm_singleflight_lock_seconds: int = 60
+    llm_singleflight_wait_seconds: float = 60.0
+    llm_backends: list[dict] = []
+    llm_hedge_enabled: bool = True
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_samples: int = 20
+    llm_hedge_default_delay_seconds: float = 2.0
+    llm_hedge_min_delay_seconds: float = 0.25
+    ai_limit_enabled: bool = True
+    ai_workspace_concurrency: int = 4
+    ai_global_concurrency: int = 32
+    ai_workspace_tpm: int = 200_000
+    ai_queue_max_depth: int = 8
+    ai_queue_timeout_seconds: float = 15.0
+    ai_lease_seconds: int = 300
+    ai_drr_quantum_tokens: int = 4000
+    ai_workspace_weights: dict[int, float] = {}
+    ai_output_tokens_estimate: int = 500
 
     @property
     def mysql_dsn(self) -> str:
@@ -4,7 +4,11 @@ Day2 我们主要用它来保存 refresh token 的 allowlist（按 jti）。
 """
 
 import redis
+import redis.asyncio
 from app.core.config import settings
 
 # decode_responses=True：让返回值是 str 而不是 bytes，写代码更省心
 redis_client = redis.Redis.from_url(settings.redis_dsn, decode_responses=True)
+
+# 异步客户端：给 SSE 这类长时间订阅用，等待消息时不占用线程池里的线程
+async_redis_client = redis.asyncio.Redis.from_url(settings.redis_dsn, decode_responses=True)
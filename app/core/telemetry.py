@@ -1,17 +1,81 @@
 from __future__ import annotations
 
+from bisect import bisect_left
 from collections import Counter
+import threading
+
+# Upper bounds in seconds; the last bucket catches everything slower.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0, 21.0, 34.0, 60.0, float("inf"))
+# Counts are halved past this many samples, so percentiles follow recent latency rather than all history.
+HISTOGRAM_DECAY_SAMPLES = 2000
+
+
+class LatencyHistogram:
+    def __init__(self) -> None:
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += 1
+        if self.total > HISTOGRAM_DECAY_SAMPLES:
+            self.counts = [count // 2 for count in self.counts]
+            self.total = sum(self.counts)
+
+    def percentile(self, quantile: float) -> float | None:
+        if not self.total:
+            return None
+        target = quantile * self.total
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            if count and seen + count >= target:
+                if bound == float("inf"):
+                    return lower
+                # Linear interpolation inside the bucket.
+                return lower + (bound - lower) * (target - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.total,
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS, self.counts)
+            },
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+        }
 
 
 class InMemoryMetrics:
     def __init__(self) -> None:
         self._counter: Counter[str] = Counter()
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
 
     def incr(self, key: str) -> None:
         self._counter[key] += 1
 
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._histograms.setdefault(key, LatencyHistogram()).observe(seconds)
+
+    def percentile(self, key: str, quantile: float, min_samples: int = 1) -> float | None:
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None or histogram.total < min_samples:
+                return None
+            return histogram.percentile(quantile)
+
     def snapshot(self) -> dict[str, int]:
         return dict(self._counter)
 
+    def histogram_snapshot(self, prefix: str = "") -> dict[str, dict]:
+        with self._lock:
+            return {key: histogram.snapshot() for key, histogram in self._histograms.items() if key.startswith(prefix)}
+
 
 metrics = InMemoryMetrics()
@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
 from app.core.config import settings
 from app.api.health import router as health_router
@@ -14,6 +15,17 @@ from app.api.ai_documents import router as ai_documents_router
 from app.api.ai_chat import router as ai_chat_router
 from app.api.ai_agents import router as ai_agents_router
 from app.api.ai_runs import router as ai_runs_router
+from app.services.llm.http import close_llm_transport
+from app.services.llm.scheduler import AIThrottled
+from app.services.rag.tokenizer import warm_tokenizer
+
+
+async def ai_throttled_handler(request: Request, exc: AIThrottled) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 def create_app() -> FastAPI:
@@ -33,6 +45,10 @@ def create_app() -> FastAPI:
     app.include_router(ai_agents_router)
     app.include_router(ai_runs_router)
 
+    app.add_exception_handler(AIThrottled, ai_throttled_handler)
+    app.add_event_handler("startup", warm_tokenizer)
+    app.add_event_handler("shutdown", close_llm_transport)
+
     return app
 
 
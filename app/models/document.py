@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 import enum
 
-from sqlalchemy import JSON, DateTime, Enum, ForeignKey, Integer, String, Text, func
+from sqlalchemy import DateTime, Enum, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -30,6 +30,12 @@ class Document(Base):
     uploaded_by: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
     storage_path: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+    canonical_document_id: Mapped[int | None] = mapped_column(
+        ForeignKey("documents.id"),
+        nullable=True,
+        index=True,
+    )
     content_type: Mapped[str] = mapped_column(String(120), nullable=False, default="text/plain")
     source_type: Mapped[DocumentSourceType] = mapped_column(
         Enum(DocumentSourceType),
@@ -43,6 +49,7 @@ class Document(Base):
     )
     chunk_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+    parse_started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
@@ -58,10 +65,42 @@ class DocumentChunk(Base):
     workspace_id: Mapped[int] = mapped_column(ForeignKey("workspaces.id"), nullable=False, index=True)
     chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
+    content_hash: Mapped[str | None] = mapped_column(String(40), nullable=True)
+    start_offset: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    end_offset: Mapped[int | None] = mapped_column(Integer, nullable=True)
     token_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
-    metadata_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    term_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
         nullable=False,
     )
+
+
+class SearchTerm(Base):
+    __tablename__ = "search_terms"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    term: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+
+
+class DocumentChunkTerm(Base):
+    __tablename__ = "document_chunk_terms"
+    __table_args__ = (
+        Index("ix_document_chunk_terms_workspace_term", "workspace_id", "term_id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    workspace_id: Mapped[int] = mapped_column(ForeignKey("workspaces.id"), nullable=False)
+    document_id: Mapped[int] = mapped_column(ForeignKey("documents.id"), nullable=False, index=True)
+    chunk_id: Mapped[int] = mapped_column(ForeignKey("document_chunks.id"), nullable=False, index=True)
+    term_id: Mapped[int] = mapped_column(ForeignKey("search_terms.id"), nullable=False)
+    term_freq: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+
+
+class WorkspaceSearchStats(Base):
+    __tablename__ = "workspace_search_stats"
+
+    workspace_id: Mapped[int] = mapped_column(ForeignKey("workspaces.id"), primary_key=True)
+    chunk_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    term_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
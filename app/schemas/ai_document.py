@@ -18,6 +18,7 @@ class DocumentOut(BaseModel):
     source_type: str
     status: str
     chunk_count: int
+    duplicate_of: int | None = None
     error_message: str | None
     created_at: datetime
 
@@ -27,6 +28,8 @@ class RetrievedChunkOut(BaseModel):
     document_id: int
     filename: str
     content: str
+    start_offset: int | None = None
+    end_offset: int | None = None
     score: float
     metadata: dict | None
 
@@ -36,4 +39,6 @@ class CitationOut(BaseModel):
     filename: str
     chunk_id: int
     snippet: str
+    start_offset: int | None = None
+    end_offset: int | None = None
 
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator, Callable
+import json
+
+from app.core.config import settings
+from app.core.redis_client import async_redis_client, redis_client
+
+# Events after which a run produces no more output; streams close once they relay one.
+TERMINAL_EVENTS = {"run_finished"}
+KEEPALIVE_SECONDS = 15.0
+
+RunEventSink = Callable[[str, dict], None]
+
+
+def run_event_log_key(run_id: int) -> str:
+    return f"agent_run:{run_id}:events"
+
+
+def run_event_seq_key(run_id: int) -> str:
+    return f"agent_run:{run_id}:seq"
+
+
+def run_event_channel(run_id: int) -> str:
+    return f"agent_run:{run_id}:channel"
+
+
+def publish_run_event(run_id: int, event: str, data: dict) -> int:
+    # Every event is numbered, appended to a capped log for late or reconnecting clients, then broadcast.
+    seq = redis_client.incr(run_event_seq_key(run_id))
+    payload = json.dumps({"seq": seq, "event": event, "data": data}, ensure_ascii=False, default=str)
+    log_key = run_event_log_key(run_id)
+    pipe = redis_client.pipeline()
+    pipe.rpush(log_key, payload)
+    pipe.ltrim(log_key, -settings.ai_agent_event_log_max, -1)
+    pipe.expire(log_key, settings.ai_agent_event_ttl_seconds)
+    pipe.expire(run_event_seq_key(run_id), settings.ai_agent_event_ttl_seconds)
+    pipe.publish(run_event_channel(run_id), payload)
+    pipe.execute()
+    return seq
+
+
+def run_event_sink(run_id: int) -> RunEventSink:
+    return lambda event, data: publish_run_event(run_id, event, data)
+
+
+async def stream_run_events(run_id: int, after_seq: int = 0, follow: bool = True) -> AsyncIterator[dict | None]:
+    # Subscribe before reading the log: an event published in between arrives twice and is dropped by seq.
+    # Yields None when nothing arrived for KEEPALIVE_SECONDS, so the caller can ping and check the run.
+    pubsub = async_redis_client.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(run_event_channel(run_id))
+    try:
+        last_seq = after_seq
+        for item in await async_redis_client.lrange(run_event_log_key(run_id), 0, -1):
+            event = json.loads(item)
+            if event["seq"] > last_seq:
+                last_seq = event["seq"]
+                yield event
+        while follow:
+            message = await pubsub.get_message(timeout=KEEPALIVE_SECONDS)
+            if message is None:
+                yield None
+                continue
+            event = json.loads(message["data"])
+            if event["seq"] > last_seq:
+                last_seq = event["seq"]
+                yield event
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
@@ -1,5 +1,12 @@
 from __future__ import annotations
 
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import time
+
+from app.core.telemetry import metrics
+from app.db.session import SessionLocal
+from app.services.agents.events import RunEventSink
+from app.services.agents.guardrails import MAX_AGENT_STEPS
 from app.services.tools.create_task_draft import create_task_draft
 from app.services.tools.list_tasks import list_project_tasks
 from app.services.tools.search_knowledge import search_knowledge
@@ -28,3 +35,70 @@ def execute_tool(
             requirement=goal,
         )
     raise ValueError(f"Unsupported tool: {tool_name}")
+
+
+# Tools listed here only start once the named tools (when planned in the same run) have finished,
+# e.g. a tool that reads rows another tool writes. The current tools are all read-only and independent.
+TOOL_DEPENDENCIES: dict[str, frozenset[str]] = {}
+
+# Each tool runs on its own short-lived Session, so independent tools overlap their database and LLM waits.
+_tool_pool = ThreadPoolExecutor(max_workers=MAX_AGENT_STEPS * 4, thread_name_prefix="agent-tool")
+
+
+def _run_tool_in_session(tool_name: str, *, workspace_id: int, project_id: int, goal: str) -> dict:
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        return execute_tool(tool_name, db=db, workspace_id=workspace_id, project_id=project_id, goal=goal)
+    finally:
+        db.close()
+        metrics.observe(f"agent_tool_latency:{tool_name}", time.perf_counter() - started)
+
+
+def execute_tools(
+    tool_plan: list[str],
+    *,
+    workspace_id: int,
+    project_id: int,
+    goal: str,
+    on_event: RunEventSink | None = None,
+) -> list[dict]:
+    planned = set(tool_plan)
+    waiting = {tool_name: TOOL_DEPENDENCIES.get(tool_name, frozenset()) & planned for tool_name in tool_plan}
+    finished: set[str] = set()
+    running: dict[Future, str] = {}
+    outputs: dict[str, dict] = {}
+
+    def submit_ready() -> None:
+        for tool_name, depends_on in list(waiting.items()):
+            if depends_on <= finished:
+                del waiting[tool_name]
+                future = _tool_pool.submit(
+                    _run_tool_in_session,
+                    tool_name,
+                    workspace_id=workspace_id,
+                    project_id=project_id,
+                    goal=goal,
+                )
+                running[future] = tool_name
+                if on_event is not None:
+                    on_event("tool_started", {"tool_name": tool_name})
+
+    submit_ready()
+    try:
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                tool_name = running.pop(future)
+                outputs[tool_name] = future.result()
+                finished.add(tool_name)
+                if on_event is not None:
+                    on_event("tool_finished", {"tool_name": tool_name, "summary": outputs[tool_name]["summary"]})
+            submit_ready()
+    finally:
+        for future in running:
+            future.cancel()
+    if waiting:
+        raise ValueError(f"Unresolvable tool dependencies: {sorted(waiting)}")
+    # Outputs keep the plan order, whichever tool finished first.
+    return [outputs[tool_name] for tool_name in tool_plan]
@@ -1,29 +1,32 @@
 from __future__ import annotations
 
-from app.services.agents.executor import execute_tool
+from app.services.agents.events import RunEventSink
+from app.services.agents.executor import execute_tools
 from app.services.agents.planner import plan_tools
 from app.services.llm.client import get_llm_provider
 
 
 def run_controlled_agent(
     *,
-    db,
     workspace_id: int,
     project_id: int,
     goal: str,
+    on_event: RunEventSink | None = None,
 ) -> tuple[list[dict], str]:
     tool_plan = plan_tools(goal)
-    outputs: list[dict] = []
-    for tool_name in tool_plan:
-        result = execute_tool(
-            tool_name,
-            db=db,
-            workspace_id=workspace_id,
-            project_id=project_id,
-            goal=goal,
-        )
-        outputs.append(result)
+    if on_event is not None:
+        on_event("plan", {"tools": tool_plan})
+    # Independent tools run concurrently, so the run takes about as long as its slowest tool.
+    outputs = execute_tools(
+        tool_plan,
+        workspace_id=workspace_id,
+        project_id=project_id,
+        goal=goal,
+        on_event=on_event,
+    )
 
-    provider = get_llm_provider()
+    provider = get_llm_provider(workspace_id)
     final_output = provider.summarize_agent_run(goal, outputs)
+    if on_event is not None:
+        on_event("final_output", {"content": final_output})
     return outputs, final_output
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.logging import new_trace_id
+from app.models.agent_run import AgentMessage, AgentMessageRole, AgentRun, AgentRunStatus
+from app.services.agents.events import publish_run_event, run_event_sink
+from app.services.agents.graph import run_controlled_agent
+from app.services.audit import write_audit
+
+# Task drafting plus the final run summary.
+AGENT_LLM_CALLS = 2
+
+
+def create_agent_run_record(
+    db: Session,
+    *,
+    workspace_id: int,
+    project_id: int,
+    user_id: int,
+    goal: str,
+    status: AgentRunStatus,
+) -> AgentRun:
+    run = AgentRun(
+        workspace_id=workspace_id,
+        project_id=project_id,
+        triggered_by=user_id,
+        goal=goal,
+        status=status,
+        trace_id=new_trace_id(),
+        started_at=datetime.now(timezone.utc) if status == AgentRunStatus.RUNNING else None,
+    )
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+
+    db.add(
+        AgentMessage(
+            run_id=run.id,
+            role=AgentMessageRole.USER,
+            content=goal,
+            step_index=0,
+        )
+    )
+    db.commit()
+    return run
+
+
+def claim_pending_run(db: Session, run_id: int) -> bool:
+    # Conditional update: a run delivered twice (or picked by two workers) is executed only once.
+    result = db.execute(
+        update(AgentRun)
+        .where(AgentRun.id == run_id, AgentRun.status == AgentRunStatus.PENDING)
+        .values(status=AgentRunStatus.RUNNING, started_at=datetime.now(timezone.utc))
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def execute_agent_run(db: Session, run: AgentRun) -> AgentRun:
+    # Steps are published as they happen, so watchers need not poll the run and its message rows.
+    publish_run_event(run.id, "run_started", {"trace_id": run.trace_id})
+    try:
+        tool_outputs, final_output = run_controlled_agent(
+            workspace_id=run.workspace_id,
+            project_id=run.project_id,
+            goal=run.goal,
+            on_event=run_event_sink(run.id),
+        )
+        for index, output in enumerate(tool_outputs, start=1):
+            db.add(
+                AgentMessage(
+                    run_id=run.id,
+                    role=AgentMessageRole.TOOL,
+                    content=output["summary"],
+                    tool_name=output["tool_name"],
+                    step_index=index,
+                    tool_input_json={"goal": run.goal, "project_id": run.project_id},
+                    tool_output_json=output,
+                )
+            )
+
+        db.add(
+            AgentMessage(
+                run_id=run.id,
+                role=AgentMessageRole.ASSISTANT,
+                content=final_output,
+                step_index=len(tool_outputs) + 1,
+            )
+        )
+        db.commit()
+
+        audit_log = write_audit(
+            db=db,
+            workspace_id=run.workspace_id,
+            actor_id=run.triggered_by,
+            action="AGENT_RUN_EXECUTE",
+            entity_type="agent_run",
+            entity_id=run.id,
+            meta={"trace_id": run.trace_id, "project_id": run.project_id, "steps": len(tool_outputs)},
+        )
+        db.commit()
+        db.refresh(audit_log)
+
+        run.status = AgentRunStatus.SUCCESS
+        run.final_output = final_output
+        run.audit_log_id = audit_log.id
+        run.finished_at = datetime.now(timezone.utc)
+        db.commit()
+        db.refresh(run)
+    except Exception as exc:
+        db.rollback()
+        run.status = AgentRunStatus.FAILED
+        run.error_message = str(exc)
+        run.finished_at = datetime.now(timezone.utc)
+        db.commit()
+        db.refresh(run)
+    publish_run_event(
+        run.id,
+        "run_finished",
+        {"status": run.status.value, "error_message": run.error_message, "audit_ref": run.audit_log_id},
+    )
+    return run
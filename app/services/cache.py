@@ -2,14 +2,21 @@
 缓存相关工具：
 - 统一管理 Redis key
 - 缓存读取/写入/失效
+- 进程内 LRU（放在 Redis 前面，省掉一次网络往返）
+- 有容量上限的 Redis 缓存（zset 索引 + 最久未用淘汰）
 """
 
+from collections import OrderedDict
+import hashlib
 import json
+import threading
+import time
 from typing import Any
 
 from app.core.redis_client import redis_client
 
 DASHBOARD_TTL_SECONDS = 60
+LLM_CACHE_INDEX_KEY = "cache:llm:index"
 
 
 def dashboard_key(workspace_id: int) -> str:
@@ -36,3 +43,88 @@ def cache_set_json(key: str, obj: Any, ttl: int) -> None:
 def cache_delete(key: str) -> None:
     """删除缓存 key"""
     redis_client.delete(key)
+
+
+class LocalLRUCache:
+    """进程内 LRU：线程安全，按条目数淘汰"""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._items: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+def index_version_key(workspace_id: int) -> str:
+    """workspace 知识库索引版本号 key（文档入库/重建/删除时递增）"""
+    return f"rag:ws:{workspace_id}:index_version"
+
+
+def get_index_version(workspace_id: int) -> int:
+    val = redis_client.get(index_version_key(workspace_id))
+    return int(val) if val else 0
+
+
+def bump_index_version(workspace_id: int) -> int:
+    """索引变化后递增版本号：旧版本的检索缓存自然失效，不需要猜 TTL"""
+    return int(redis_client.incr(index_version_key(workspace_id)))
+
+
+def retrieval_key(
+    workspace_id: int,
+    version: int,
+    query: str,
+    top_k: int,
+    document_ids: list[int] | None,
+    variant: str,
+) -> str:
+    """检索结果缓存 key：query 归一化（小写 + 合并空白）后取 hash"""
+    normalized = " ".join(query.lower().split())
+    raw = json.dumps([normalized, top_k, sorted(document_ids or []), variant])
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f"cache:ws:{workspace_id}:rag:v{version}:{digest}"
+
+
+def llm_response_key(workspace_id: int | None, method: str, fingerprint: list) -> str:
+    """LLM 响应缓存 key：方法 + 输入指纹（问题、上下文 chunk id 与内容 hash、模型、prompt 版本）取 hash"""
+    raw = json.dumps([method, fingerprint], ensure_ascii=False, sort_keys=True)
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    scope = f"ws:{workspace_id}" if workspace_id is not None else "global"
+    return f"cache:llm:{scope}:{digest}"
+
+
+def bounded_cache_get_json(index_key: str, key: str) -> Any | None:
+    """读取 JSON；命中时刷新它在 zset 索引里的时间，淘汰按最久未使用"""
+    value = cache_get_json(key)
+    if value is not None:
+        redis_client.zadd(index_key, {key: time.time()}, xx=True)
+    return value
+
+
+def bounded_cache_set_json(index_key: str, key: str, obj: Any, ttl: int, max_entries: int) -> None:
+    """写入 JSON 并登记到 zset 索引；超过 max_entries 时淘汰最久未使用的条目"""
+    now = time.time()
+    pipe = redis_client.pipeline()
+    pipe.setex(key, ttl, json.dumps(obj, default=str))
+    pipe.zadd(index_key, {key: now})
+    # 已经过期的条目只清索引，不用再删 key
+    pipe.zremrangebyscore(index_key, "-inf", now - ttl)
+    pipe.zcard(index_key)
+    size = pipe.execute()[-1]
+    if size > max_entries:
+        evicted = redis_client.zpopmin(index_key, size - max_entries)
+        if evicted:
+            redis_client.delete(*[member for member, _ in evicted])
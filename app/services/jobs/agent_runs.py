@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta, timezone
+import logging
+import threading
+import time
+
+from sqlalchemy import and_, or_, select, update
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.session import SessionLocal
+from app.models.agent_run import AgentRun, AgentRunStatus
+from app.services.agents.runs import AGENT_LLM_CALLS, claim_pending_run, execute_agent_run
+from app.services.jobs.queue import ReliableQueue, start_reaper, worker_id
+from app.services.llm.scheduler import AIThrottled, estimate_request_tokens, fair_share_slot
+
+AGENT_RUN_QUEUE = "queue:agent_runs"
+QUEUE_POLL_TIMEOUT_SECONDS = 5
+
+agent_run_queue = ReliableQueue(AGENT_RUN_QUEUE)
+
+logger = get_logger(__name__)
+
+
+def enqueue_agent_run(run_id: int) -> None:
+    agent_run_queue.push(run_id)
+
+
+def process_agent_run(run_id: int) -> None:
+    db = SessionLocal()
+    try:
+        run = db.execute(select(AgentRun).where(AgentRun.id == run_id)).scalar_one_or_none()
+        if run is None or run.status != AgentRunStatus.PENDING:
+            return
+        # The fair-share slot is taken before the claim, so a throttled run stays PENDING and can be requeued.
+        with fair_share_slot(run.workspace_id, estimate_request_tokens(run.goal, llm_calls=AGENT_LLM_CALLS)):
+            if not claim_pending_run(db, run_id):
+                return
+            db.refresh(run)
+            execute_agent_run(db, run)
+    finally:
+        db.close()
+
+
+def reap_agent_runs() -> None:
+    # Requeues runs nobody holds: PENDING rows whose enqueue failed, RUNNING rows whose worker's processing
+    # list was dropped, and RUNNING rows past AI_AGENT_RUN_LEASE_SECONDS. Synchronous runs execute in the API
+    # and are never queued, so only the lease, longer than any run, may reclaim a RUNNING row not seen on the
+    # queue. A requeued RUNNING run starts over from its goal.
+    held, orphaned = agent_run_queue.held_items()
+    now = datetime.now(timezone.utc)
+    pending_cutoff = now - timedelta(seconds=settings.ai_worker_orphan_grace_seconds)
+    running_cutoff = now - timedelta(seconds=settings.ai_agent_run_lease_seconds)
+    db = SessionLocal()
+    try:
+        orphans = db.execute(
+            select(AgentRun.id, AgentRun.status).where(
+                or_(
+                    and_(AgentRun.status == AgentRunStatus.PENDING, AgentRun.created_at < pending_cutoff),
+                    and_(
+                        AgentRun.status == AgentRunStatus.RUNNING,
+                        or_(AgentRun.started_at < running_cutoff, AgentRun.id.in_([int(item) for item in orphaned])),
+                    ),
+                )
+            )
+        ).all()
+        for run_id, status in orphans:
+            if str(run_id) in held:
+                continue
+            if status == AgentRunStatus.RUNNING:
+                result = db.execute(
+                    update(AgentRun)
+                    .where(AgentRun.id == run_id, AgentRun.status == AgentRunStatus.RUNNING)
+                    .values(status=AgentRunStatus.PENDING, started_at=None)
+                )
+                db.commit()
+                if result.rowcount != 1:
+                    continue
+            logger.warning("Requeueing orphaned %s agent run %s", status.value, run_id)
+            enqueue_agent_run(run_id)
+    finally:
+        db.close()
+
+
+def _consume_agent_runs(consumer: str) -> None:
+    while True:
+        run_id = agent_run_queue.take(consumer, QUEUE_POLL_TIMEOUT_SECONDS)
+        if run_id is None:
+            continue
+        try:
+            process_agent_run(int(run_id))
+        except AIThrottled as exc:
+            # Back of the queue: runs from other workspaces go first while this one's limits recover.
+            enqueue_agent_run(int(run_id))
+            time.sleep(exc.retry_after)
+        except Exception:
+            logger.exception("Agent run %s could not be processed", run_id)
+        finally:
+            # Acked only once the run is settled; until then the reaper sees it as held by this worker.
+            agent_run_queue.ack(consumer, run_id)
+
+
+def run_agent_run_worker(workers: int | None = None) -> None:
+    # PENDING -> RUNNING -> SUCCESS/FAILED happens here; each thread holds at most one run at a time.
+    workers = max(1, workers or settings.ai_agent_run_workers)
+    worker = worker_id()
+    start_reaper(agent_run_queue, worker, reap_agent_runs)
+    threads = [
+        threading.Thread(
+            target=_consume_agent_runs,
+            args=(f"{worker}:{index}",),
+            name=f"agent-run-{index}",
+            daemon=True,
+        )
+        for index in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Execute queued agent runs.")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    run_agent_run_worker(args.workers)
@@ -1,10 +1,114 @@
 from __future__ import annotations
 
+from datetime import datetime, timedelta, timezone
+import logging
+
+from sqlalchemy import and_, or_, select, update
 from sqlalchemy.orm import Session
 
-from app.models.document import Document
-from app.services.rag.ingest import ingest_document_content
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.session import SessionLocal
+from app.models.document import Document, DocumentStatus
+from app.services.cache import bump_index_version
+from app.services.jobs.queue import ReliableQueue, start_reaper, worker_id
+from app.services.rag.ingest import ingest_document_content, ingest_stored_document
+
+DOCUMENT_INGEST_QUEUE = "queue:document_ingest"
+QUEUE_POLL_TIMEOUT_SECONDS = 5
+
+document_ingest_queue = ReliableQueue(DOCUMENT_INGEST_QUEUE)
+
+logger = get_logger(__name__)
 
 
 def run_document_ingest(db: Session, document: Document, content: str) -> Document:
     return ingest_document_content(db, document, content)
+
+
+def enqueue_document_ingest(document_id: int) -> None:
+    document_ingest_queue.push(document_id)
+
+
+def process_document_ingest(document_id: int) -> None:
+    db = SessionLocal()
+    try:
+        document = db.execute(select(Document).where(Document.id == document_id)).scalar_one_or_none()
+        if document is None or document.status != DocumentStatus.PENDING:
+            return
+        try:
+            ingest_stored_document(db, document)
+        except Exception as exc:
+            db.rollback()
+            document.status = DocumentStatus.FAILED
+            document.error_message = str(exc)
+            db.commit()
+            bump_index_version(document.workspace_id)
+            logger.exception("Document ingest failed for document %s", document_id)
+    finally:
+        db.close()
+
+
+def reap_document_ingests() -> None:
+    # Requeues documents nobody holds: PENDING rows whose enqueue failed, PARSING rows whose worker's processing
+    # list was dropped, and PARSING rows past AI_INGEST_PARSE_LEASE_SECONDS, since synchronous uploads parse in
+    # the API and are never queued.
+    held, orphaned = document_ingest_queue.held_items()
+    now = datetime.now(timezone.utc)
+    pending_cutoff = now - timedelta(seconds=settings.ai_worker_orphan_grace_seconds)
+    parsing_cutoff = now - timedelta(seconds=settings.ai_ingest_parse_lease_seconds)
+    db = SessionLocal()
+    try:
+        orphans = db.execute(
+            select(Document.id, Document.status).where(
+                or_(
+                    and_(Document.status == DocumentStatus.PENDING, Document.created_at < pending_cutoff),
+                    and_(
+                        Document.status == DocumentStatus.PARSING,
+                        or_(
+                            Document.parse_started_at < parsing_cutoff,
+                            Document.id.in_([int(item) for item in orphaned]),
+                        ),
+                    ),
+                )
+            )
+        ).all()
+        for document_id, status in orphans:
+            if str(document_id) in held:
+                continue
+            if status == DocumentStatus.PARSING:
+                result = db.execute(
+                    update(Document)
+                    .where(Document.id == document_id, Document.status == DocumentStatus.PARSING)
+                    .values(status=DocumentStatus.PENDING, parse_started_at=None)
+                )
+                db.commit()
+                if result.rowcount != 1:
+                    continue
+            logger.warning("Requeueing orphaned %s document %s", status.value, document_id)
+            enqueue_document_ingest(document_id)
+    finally:
+        db.close()
+
+
+def run_document_ingest_worker() -> None:
+    # PENDING -> PARSING -> INDEXED/FAILED happens here, outside the API workers.
+    worker = worker_id()
+    consumer = f"{worker}:0"
+    start_reaper(document_ingest_queue, worker, reap_document_ingests)
+    while True:
+        document_id = document_ingest_queue.take(consumer, QUEUE_POLL_TIMEOUT_SECONDS)
+        if document_id is None:
+            continue
+        try:
+            process_document_ingest(int(document_id))
+        except Exception:
+            # A transient database error must not stop ingestion; the reaper requeues the document if needed.
+            logger.exception("Document %s could not be processed", document_id)
+        finally:
+            document_ingest_queue.ack(consumer, document_id)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_document_ingest_worker()
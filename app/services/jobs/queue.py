@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+import os
+import socket
+import threading
+import time
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.redis_client import redis_client
+
+logger = get_logger(__name__)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ReliableQueue:
+    """A Redis list whose items move to a per-consumer processing list until the consumer acks them.
+
+    A consumer is `<worker id>:<thread index>`; each worker process keeps a heartbeat key alive, so the
+    processing lists of a worker that died can be told apart from those of one that is still busy.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def _processing_prefix(self) -> str:
+        return f"{self.name}:processing:"
+
+    def _heartbeat_key(self, worker: str) -> str:
+        return f"{self.name}:alive:{worker}"
+
+    def push(self, item: int) -> None:
+        redis_client.lpush(self.name, str(item))
+
+    def take(self, consumer: str, timeout: float) -> str | None:
+        return redis_client.blmove(self.name, self._processing_prefix() + consumer, timeout, "RIGHT", "LEFT")
+
+    def ack(self, consumer: str, item: str) -> None:
+        redis_client.lrem(self._processing_prefix() + consumer, 1, item)
+
+    def heartbeat(self, worker: str) -> None:
+        redis_client.set(self._heartbeat_key(worker), "1", ex=settings.ai_worker_heartbeat_ttl_seconds)
+
+    def held_items(self) -> tuple[set[str], set[str]]:
+        # Returns the items still queued or held by a live consumer, and the items the processing lists of dead
+        # workers held. Those lists are dropped: the caller recovers their items from the database, where the
+        # row status says whether work remains.
+        prefix = self._processing_prefix()
+        live: list[str] = []
+        orphaned: set[str] = set()
+        for key in redis_client.scan_iter(match=f"{prefix}*"):
+            worker = key[len(prefix):].rsplit(":", 1)[0]
+            if redis_client.exists(self._heartbeat_key(worker)):
+                live.append(key)
+                continue
+            logger.warning("Dropping processing list %s of dead worker %s", key, worker)
+            orphaned.update(redis_client.lrange(key, 0, -1))
+            redis_client.delete(key)
+        # One transaction, so an item moving from the queue into a processing list is seen in one of them.
+        pipe = redis_client.pipeline()
+        pipe.lrange(self.name, 0, -1)
+        for key in live:
+            pipe.lrange(key, 0, -1)
+        held: set[str] = set()
+        for items in pipe.execute():
+            held.update(items)
+        return held, orphaned - held
+
+
+def start_reaper(queue: ReliableQueue, worker: str, reap: Callable[[], None]) -> threading.Thread:
+    # Runs once at startup, then every AI_WORKER_REAP_INTERVAL_SECONDS, refreshing the worker's heartbeat first.
+    queue.heartbeat(worker)
+
+    def loop() -> None:
+        while True:
+            try:
+                queue.heartbeat(worker)
+                reap()
+            except Exception:
+                logger.exception("Reaping %s failed", queue.name)
+            time.sleep(settings.ai_worker_reap_interval_seconds)
+
+    thread = threading.Thread(target=loop, name=f"{queue.name}-reaper", daemon=True)
+    thread.start()
+    return thread
@@ -1,15 +1,175 @@
 from __future__ import annotations
 
-from pathlib import Path
+import argparse
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+import logging
+from multiprocessing import get_context
+import os
+import time
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.models.document import Document
-from app.services.rag.ingest import ingest_document_content
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.redis_client import redis_client
+from app.db.session import SessionLocal
+from app.models.document import Document, DocumentStatus
+from app.services.rag.chunking import iter_chunk_spans
+from app.services.rag.parsers import detect_format
+from app.services.rag.ingest import (
+    PreparedChunkBatch,
+    StaleChunkPlan,
+    apply_reindex_batches,
+    iter_document_text,
+    iter_source_text,
+    load_chunk_hashes,
+    prepare_reindex_batches,
+    reindex_document_chunks,
+)
+
+REINDEX_PROGRESS_TTL_SECONDS = 7 * 86400
+
+logger = get_logger(__name__)
 
 
 def reindex_document(db: Session, document: Document) -> Document:
-    if not document.storage_path:
-        raise ValueError("Document has no persisted storage path")
-    content = Path(document.storage_path).read_text(encoding="utf-8")
-    return ingest_document_content(db, document, content)
+    if document.canonical_document_id is not None:
+        # Duplicates share the canonical document's chunks; reindex that one instead.
+        return document
+    return reindex_document_chunks(db, document, iter_chunk_spans(iter_document_text(document)))
+
+
+def _reindex_scope(workspace_id: int | None) -> str:
+    return f"ws:{workspace_id}" if workspace_id is not None else "all"
+
+
+def _progress_key(scope: str) -> str:
+    return f"reindex:{scope}"
+
+
+def _done_key(scope: str) -> str:
+    return f"reindex:{scope}:done"
+
+
+def get_reindex_progress(workspace_id: int | None = None) -> dict[str, str]:
+    return redis_client.hgetall(_progress_key(_reindex_scope(workspace_id)))
+
+
+def _prepare_document(
+    storage_path: str,
+    document_format: str,
+    known_hashes: Counter[str],
+) -> list[PreparedChunkBatch]:
+    # Runs in a worker process: read, chunk, tokenize and embed without touching the database.
+    spans = iter_chunk_spans(iter_source_text(storage_path, document_format))
+    return list(prepare_reindex_batches(spans, known_hashes))
+
+
+def _reindex_candidates(db: Session, workspace_id: int | None) -> list[int]:
+    stmt = (
+        select(Document.id)
+        .where(
+            Document.canonical_document_id.is_(None),
+            Document.storage_path.is_not(None),
+            Document.status.in_([DocumentStatus.INDEXED, DocumentStatus.FAILED]),
+        )
+        .order_by(Document.id.asc())
+    )
+    if workspace_id is not None:
+        stmt = stmt.where(Document.workspace_id == workspace_id)
+    return list(db.execute(stmt).scalars())
+
+
+def _write_document(db: Session, document_id: int, future: Future) -> None:
+    batches = future.result()
+    document = db.get(Document, document_id)
+    if document is None or document.canonical_document_id is not None:
+        return
+    try:
+        apply_reindex_batches(db, document, batches)
+    except StaleChunkPlan:
+        # The document was re-ingested while its batches were being prepared; redo it inline.
+        reindex_document(db, document)
+
+
+def run_reindex(
+    workspace_id: int | None = None,
+    workers: int | None = None,
+    restart: bool = False,
+) -> dict[str, str]:
+    scope = _reindex_scope(workspace_id)
+    progress_key, done_key = _progress_key(scope), _done_key(scope)
+    if restart:
+        redis_client.delete(progress_key, done_key)
+
+    db = SessionLocal()
+    try:
+        document_ids = _reindex_candidates(db, workspace_id)
+        # Resume: documents written by an earlier (crashed or interrupted) run are skipped.
+        done = {int(value) for value in redis_client.smembers(done_key)}
+        pending = deque(document_id for document_id in document_ids if document_id not in done)
+        redis_client.hset(
+            progress_key,
+            mapping={
+                "status": "running",
+                "total": len(document_ids),
+                "done": len(document_ids) - len(pending),
+                "failed": 0,
+            },
+        )
+        redis_client.expire(progress_key, REINDEX_PROGRESS_TTL_SECONDS)
+        db.commit()
+
+        workers = max(1, workers or settings.ai_reindex_workers or os.cpu_count() or 1)
+        # Bounded in-flight work keeps prepared batches from piling up in memory ahead of the writer.
+        max_in_flight = workers * 2
+        in_flight: dict[Future, int] = {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            while pending or in_flight:
+                while pending and len(in_flight) < max_in_flight:
+                    document = db.get(Document, pending.popleft())
+                    if document is None or not document.storage_path:
+                        continue
+                    known_hashes = load_chunk_hashes(db, document.id)
+                    document_format = detect_format(document.filename, document.content_type)
+                    in_flight[
+                        pool.submit(_prepare_document, document.storage_path, document_format, known_hashes)
+                    ] = document.id
+                # Single writer: one session, and its connection goes back to the pool between documents.
+                db.commit()
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    document_id = in_flight.pop(future)
+                    try:
+                        _write_document(db, document_id, future)
+                    except Exception:
+                        db.rollback()
+                        redis_client.hincrby(progress_key, "failed", 1)
+                        logger.exception("Reindex failed for document %s", document_id)
+                    else:
+                        redis_client.sadd(done_key, document_id)
+                        redis_client.expire(done_key, REINDEX_PROGRESS_TTL_SECONDS)
+                        completed = redis_client.hincrby(progress_key, "done", 1)
+                        logger.info("Reindex %s: %s/%s documents", scope, completed, len(document_ids))
+                    # Throttle so the live API keeps its share of database and Redis capacity.
+                    time.sleep(settings.ai_reindex_pause_ms / 1000)
+
+        failed = int(redis_client.hget(progress_key, "failed") or 0)
+        redis_client.hset(progress_key, "status", "failed" if failed else "completed")
+        if not failed:
+            redis_client.delete(done_key)
+        return get_reindex_progress(workspace_id)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Reindex documents after chunking or tokenizer changes.")
+    parser.add_argument("--workspace", type=int, default=None, help="Workspace id; omit to reindex every workspace")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--restart", action="store_true", help="Ignore progress saved by a previous run")
+    args = parser.parse_args()
+    print(run_reindex(args.workspace, workers=args.workers, restart=args.restart))
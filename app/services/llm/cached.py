@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Callable, Sequence
+import hashlib
+from typing import Any
+
+from app.core.config import settings
+from app.core.telemetry import metrics
+from app.services.cache import (
+    LLM_CACHE_INDEX_KEY,
+    bounded_cache_get_json,
+    bounded_cache_set_json,
+    llm_response_key,
+)
+from app.services.llm.prompts import PROMPT_VERSION
+from app.services.llm.providers import BaseLLMProvider
+from app.services.llm.singleflight import coalesce
+
+
+def fingerprint_contexts(contexts: Sequence[dict]) -> list:
+    # Exact chunks plus a hash of the text the prompt actually contains (packed contexts merge chunks).
+    return [
+        [
+            item.get("chunk_ids") or [item.get("chunk_id")],
+            item.get("filename"),
+            hashlib.sha1(item["content"].encode("utf-8")).hexdigest(),
+        ]
+        for item in contexts
+    ]
+
+
+class CachedLLMProvider(BaseLLMProvider):
+    def __init__(self, provider: BaseLLMProvider, model: str, workspace_id: int | None = None) -> None:
+        self.provider = provider
+        self.model = model
+        self.workspace_id = workspace_id
+
+    def _key(self, method: str, inputs: list) -> str:
+        return llm_response_key(self.workspace_id, method, [self.model, PROMPT_VERSION, *inputs])
+
+    def _lookup(self, key: str) -> Any | None:
+        if not settings.llm_cache_enabled:
+            return None
+        cached = bounded_cache_get_json(LLM_CACHE_INDEX_KEY, key)
+        outcome = "hits" if cached is not None else "misses"
+        metrics.incr(f"llm_cache_{outcome}")
+        if self.workspace_id is not None:
+            metrics.incr(f"llm_cache_{outcome}:ws:{self.workspace_id}")
+        return cached
+
+    def _store(self, key: str, value: Any) -> None:
+        if not settings.llm_cache_enabled:
+            return
+        bounded_cache_set_json(
+            LLM_CACHE_INDEX_KEY,
+            key,
+            value,
+            settings.llm_cache_ttl_seconds,
+            settings.llm_cache_max_entries,
+        )
+
+    def _cached(self, method: str, inputs: list, compute: Callable[[], Any]) -> Any:
+        key = self._key(method, inputs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        # Identical concurrent calls (in this process or others) share one upstream request.
+        value = coalesce(key, compute)
+        self._store(key, value)
+        return value
+
+    def generate_answer(self, question: str, contexts: Sequence[dict]) -> str:
+        return self._cached(
+            "generate_answer",
+            [question, fingerprint_contexts(contexts)],
+            lambda: self.provider.generate_answer(question, contexts),
+        )
+
+    async def stream_answer(self, question: str, contexts: Sequence[dict]) -> AsyncIterator[str]:
+        # Shares entries with generate_answer; only a stream that ran to completion is stored. The cache uses
+        # the sync Redis client, so its calls run in a thread rather than on the event loop.
+        key = self._key("generate_answer", [question, fingerprint_contexts(contexts)])
+        cached = await asyncio.to_thread(self._lookup, key)
+        if cached is not None:
+            yield cached
+            return
+        pieces: list[str] = []
+        async for piece in self.provider.stream_answer(question, contexts):
+            pieces.append(piece)
+            yield piece
+        await asyncio.to_thread(self._store, key, "".join(pieces))
+
+    def summarize_agent_run(self, goal: str, tool_outputs: Sequence[dict]) -> str:
+        return self._cached(
+            "summarize_agent_run",
+            [goal, [[item["tool_name"], item["summary"]] for item in tool_outputs]],
+            lambda: self.provider.summarize_agent_run(goal, tool_outputs),
+        )
+
+    def draft_tasks(self, requirement: str, contexts: Sequence[dict]) -> list[dict]:
+        return self._cached(
+            "draft_tasks",
+            [requirement, fingerprint_contexts(contexts)],
+            lambda: self.provider.draft_tasks(requirement, contexts),
+        )
@@ -1,10 +1,53 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
 from app.core.config import settings
-from app.services.llm.providers import BaseLLMProvider, DeterministicLLMProvider
+from app.services.llm.cached import CachedLLMProvider
+from app.services.llm.hedged import HedgedLLMProvider, LLMBackend
+from app.services.llm.http import LLMEndpoint
+from app.services.llm.providers import BaseLLMProvider, DeterministicLLMProvider, OpenAICompatibleProvider
+
+
+def _make_provider(provider_name: str, model: str, endpoint: LLMEndpoint) -> BaseLLMProvider:
+    provider_name = provider_name.lower()
+    if provider_name == "deterministic":
+        return DeterministicLLMProvider()
+    if provider_name in {"openai", "openai_compatible"}:
+        return OpenAICompatibleProvider(model, endpoint)
+    raise ValueError(f"Unsupported LLM provider: {provider_name}")
+
+
+def _backend_configs() -> list[dict]:
+    # LLM_BACKENDS is a JSON list in priority order; without it the single LLM_PROVIDER settings are used.
+    if settings.llm_backends:
+        return settings.llm_backends
+    return [{"provider": settings.llm_provider, "model": settings.llm_model}]
+
+
+def _model_fingerprint() -> str:
+    return ",".join(
+        f"{config['provider']}:{config.get('model', settings.llm_model)}" for config in _backend_configs()
+    )
+
+
+@lru_cache(maxsize=1)
+def _build_provider() -> BaseLLMProvider:
+    # Built once per process: HTTP providers share one pooled client per endpoint across requests.
+    backends = []
+    for index, config in enumerate(_backend_configs()):
+        provider = _make_provider(
+            config["provider"],
+            config.get("model", settings.llm_model),
+            LLMEndpoint(base_url=config.get("base_url"), api_key=config.get("api_key")),
+        )
+        backends.append(LLMBackend(name=config.get("name") or f"{config['provider']}-{index}", provider=provider))
+    if len(backends) == 1:
+        return backends[0].provider
+    return HedgedLLMProvider(backends)
 
 
-def get_llm_provider() -> BaseLLMProvider:
-    # MVP keeps the provider pluggable while defaulting to a deterministic implementation.
-    _provider_name = settings.llm_provider.lower()
-    return DeterministicLLMProvider()
+def get_llm_provider(workspace_id: int | None = None) -> BaseLLMProvider:
+    # The wrapper is cheap: it adds response caching and single-flight coalescing around the shared provider,
+    # and binding the workspace scopes its keys and hit/miss metrics.
+    return CachedLLMProvider(_build_provider(), _model_fingerprint(), workspace_id)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from dataclasses import dataclass
+import time
+from typing import Any
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.telemetry import metrics
+from app.services.llm.http import LLMProviderError, transport
+from app.services.llm.providers import BaseLLMProvider
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class LLMBackend:
+    name: str
+    provider: BaseLLMProvider
+
+
+def latency_key(backend_name: str, method: str) -> str:
+    return f"llm_latency:{backend_name}:{method}"
+
+
+def hedge_delay(backend_name: str, method: str) -> float:
+    # Waiting for the backend's own tail percentile means only the slowest few percent of calls get a hedge.
+    observed = metrics.percentile(
+        latency_key(backend_name, method),
+        settings.llm_hedge_percentile,
+        min_samples=settings.llm_hedge_min_samples,
+    )
+    if observed is None:
+        return settings.llm_hedge_default_delay_seconds
+    return max(settings.llm_hedge_min_delay_seconds, observed)
+
+
+class HedgedLLMProvider(BaseLLMProvider):
+    """Calls backends in order: a slow primary gets a hedged request to the next backend, a failing one falls back."""
+
+    def __init__(self, backends: Sequence[LLMBackend]) -> None:
+        if not backends:
+            raise ValueError("At least one LLM backend is required")
+        self.backends = list(backends)
+
+    async def _timed(self, backend: LLMBackend, method: str, call: Awaitable[Any]) -> Any:
+        started = time.perf_counter()
+        result = await call
+        # Only completed calls are recorded; cancelled losers would drag the percentile down.
+        metrics.observe(latency_key(backend.name, method), time.perf_counter() - started)
+        return result
+
+    async def _race(self, method: str, start: Callable[[LLMBackend], Awaitable[Any]]) -> Any:
+        waiting = list(self.backends)
+        pending: dict[asyncio.Task, LLMBackend] = {}
+        errors: list[str] = []
+        latest = waiting[0]
+
+        def launch() -> None:
+            nonlocal latest
+            latest = waiting.pop(0)
+            pending[asyncio.ensure_future(self._timed(latest, method, start(latest)))] = latest
+
+        launch()
+        try:
+            while pending:
+                delay = hedge_delay(latest.name, method) if settings.llm_hedge_enabled and waiting else None
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    metrics.incr(f"llm_hedged:{latest.name}")
+                    launch()
+                    continue
+                for task in done:
+                    backend = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as exc:
+                        errors.append(f"{backend.name}: {exc}")
+                        metrics.incr(f"llm_backend_errors:{backend.name}")
+                        logger.warning("LLM backend %s failed on %s: %s", backend.name, method, exc)
+                        continue
+                    metrics.incr(f"llm_backend_wins:{backend.name}")
+                    return result
+                if waiting:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        raise LLMProviderError(f"All LLM backends failed: {'; '.join(errors)}")
+
+    def _call(self, method: str, *args) -> Any:
+        # The race runs on the transport loop, where HTTP backends can be cancelled mid-request.
+        return transport.run_sync(self._race(method, lambda backend: backend.provider.acall(method, *args)))
+
+    async def acall(self, method: str, *args):
+        return await self._race(method, lambda backend: backend.provider.acall(method, *args))
+
+    def generate_answer(self, question: str, contexts: Sequence[dict]) -> str:
+        return self._call("generate_answer", question, contexts)
+
+    def summarize_agent_run(self, goal: str, tool_outputs: Sequence[dict]) -> str:
+        return self._call("summarize_agent_run", goal, tool_outputs)
+
+    def draft_tasks(self, requirement: str, contexts: Sequence[dict]) -> list[dict]:
+        return self._call("draft_tasks", requirement, contexts)
+
+    async def stream_answer(self, question: str, contexts: Sequence[dict]) -> AsyncIterator[str]:
+        # Streams race to their first piece; once a backend has produced output the others are dropped,
+        # since a half-sent answer cannot be switched to another backend.
+        streams: list[AsyncIterator[str]] = []
+
+        async def first_piece(backend: LLMBackend) -> tuple[AsyncIterator[str], str | None]:
+            stream = backend.provider.stream_answer(question, contexts)
+            streams.append(stream)
+            try:
+                return stream, await anext(stream)
+            except StopAsyncIteration:
+                return stream, None
+
+        winner, piece = await self._race("stream_answer", first_piece)
+        for stream in streams:
+            if stream is not winner:
+                await stream.aclose()
+        if piece is None:
+            return
+        yield piece
+        async for piece in winner:
+            yield piece
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Callable, Coroutine
+from dataclasses import dataclass
+import json
+import random
+import threading
+from typing import Any, TypeVar
+
+import httpx
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# Timeouts, dropped connections and stale keep-alive sockets are worth another attempt; other transport
+# errors (bad URL, proxy or TLS setup) would fail the same way again.
+RETRY_TRANSPORT_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+T = TypeVar("T")
+logger = get_logger(__name__)
+
+
+class LLMProviderError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class LLMEndpoint:
+    base_url: str | None = None
+    api_key: str | None = None
+
+
+DEFAULT_ENDPOINT = LLMEndpoint()
+
+
+class _LLMTransport:
+    """One event loop thread and one pooled AsyncClient per endpoint, shared by every provider call."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._clients: dict[LLMEndpoint, httpx.AsyncClient] = {}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-http", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def client(self, endpoint: LLMEndpoint = DEFAULT_ENDPOINT) -> httpx.AsyncClient:
+        # Only called on the transport loop, so the client and its connections never cross event loops.
+        client = self._clients.get(endpoint)
+        if client is None:
+            base_url = endpoint.base_url or settings.llm_base_url or "https://api.openai.com/v1"
+            api_key = endpoint.api_key or settings.llm_api_key
+            client = self._clients[endpoint] = httpx.AsyncClient(
+                base_url=base_url,
+                headers={"Authorization": f"Bearer {api_key}"} if api_key else None,
+                http2=settings.llm_http2,
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive_connections=settings.llm_max_keepalive_connections,
+                    keepalive_expiry=settings.llm_keepalive_expiry_seconds,
+                ),
+                timeout=httpx.Timeout(
+                    settings.llm_read_timeout_seconds,
+                    connect=settings.llm_connect_timeout_seconds,
+                    pool=settings.llm_connect_timeout_seconds,
+                ),
+            )
+        return client
+
+    def run_sync(self, coro: Coroutine[Any, Any, T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    async def run_async(self, coro: Coroutine[Any, Any, T]) -> T:
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()))
+
+    def close(self) -> None:
+        with self._lock:
+            loop, clients = self._loop, list(self._clients.values())
+            self._loop, self._clients = None, {}
+        if loop is None:
+            return
+        for client in clients:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+
+transport = _LLMTransport()
+
+
+def _retry_delay(attempt: int, response: httpx.Response | None) -> float:
+    if response is not None and (retry_after := response.headers.get("Retry-After")):
+        try:
+            return min(float(retry_after), settings.llm_retry_backoff_max_seconds)
+        except ValueError:
+            pass
+    # Full jitter keeps clients that failed together from retrying in lockstep.
+    ceiling = min(settings.llm_retry_backoff_max_seconds, settings.llm_retry_backoff_seconds * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+async def _post_json(path: str, payload: dict, endpoint: LLMEndpoint) -> dict:
+    client = transport.client(endpoint)
+    for attempt in range(settings.llm_max_retries + 1):
+        response: httpx.Response | None = None
+        try:
+            response = await client.post(path, json=payload)
+        except RETRY_TRANSPORT_ERRORS as exc:
+            if attempt == settings.llm_max_retries:
+                raise LLMProviderError(f"LLM request failed: {exc}") from exc
+        except httpx.HTTPError as exc:
+            raise LLMProviderError(f"LLM request failed: {exc}") from exc
+        else:
+            if response.status_code < 400:
+                try:
+                    return response.json()
+                except ValueError as exc:
+                    raise LLMProviderError("LLM returned a malformed response") from exc
+            if response.status_code not in RETRY_STATUS_CODES or attempt == settings.llm_max_retries:
+                raise LLMProviderError(f"LLM request failed with HTTP {response.status_code}")
+        delay = _retry_delay(attempt, response)
+        logger.warning("LLM request to %s failed (attempt %s), retrying in %.2fs", path, attempt + 1, delay)
+        await asyncio.sleep(delay)
+    raise LLMProviderError("LLM request failed")
+
+
+async def _stream_events(
+    path: str, payload: dict, endpoint: LLMEndpoint, emit: Callable[[object], None]
+) -> None:
+    client = transport.client(endpoint)
+    for attempt in range(settings.llm_max_retries + 1):
+        response: httpx.Response | None = None
+        try:
+            async with client.stream("POST", path, json=payload) as response:
+                if response.status_code < 400:
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            return
+                        try:
+                            emit(json.loads(data))
+                        except ValueError as exc:
+                            raise LLMProviderError("LLM stream sent a malformed event") from exc
+                    return
+                if response.status_code not in RETRY_STATUS_CODES or attempt == settings.llm_max_retries:
+                    raise LLMProviderError(f"LLM request failed with HTTP {response.status_code}")
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as exc:
+            # Only failures before the first byte are retried; a broken stream cannot be resumed.
+            if attempt == settings.llm_max_retries:
+                raise LLMProviderError(f"LLM request failed: {exc}") from exc
+        except httpx.HTTPError as exc:
+            raise LLMProviderError(f"LLM stream failed: {exc}") from exc
+        delay = _retry_delay(attempt, response)
+        logger.warning("LLM stream to %s failed (attempt %s), retrying in %.2fs", path, attempt + 1, delay)
+        await asyncio.sleep(delay)
+
+
+async def astream_json_events(
+    path: str, payload: dict, endpoint: LLMEndpoint = DEFAULT_ENDPOINT
+) -> AsyncIterator[dict]:
+    # The stream is read on the transport loop; events are handed to the caller's loop through a queue.
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    def emit(item: object) -> None:
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    async def produce() -> None:
+        try:
+            await _stream_events(path, payload, endpoint, emit)
+        except asyncio.CancelledError:
+            return
+        except Exception as exc:
+            emit(exc)
+        else:
+            emit(finished)
+
+    future = asyncio.run_coroutine_threadsafe(produce(), transport._ensure_loop())
+    try:
+        while (item := await queue.get()) is not finished:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # The consumer went away (client disconnected): stop reading from the upstream connection.
+        future.cancel()
+
+
+def post_json(path: str, payload: dict, endpoint: LLMEndpoint = DEFAULT_ENDPOINT) -> dict:
+    return transport.run_sync(_post_json(path, payload, endpoint))
+
+
+async def apost_json(path: str, payload: dict, endpoint: LLMEndpoint = DEFAULT_ENDPOINT) -> dict:
+    return await transport.run_async(_post_json(path, payload, endpoint))
+
+
+def close_llm_transport() -> None:
+    transport.close()
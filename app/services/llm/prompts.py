@@ -1,3 +1,6 @@
+# Part of every LLM cache key: bump whenever a prompt below changes so stale answers are not served.
+PROMPT_VERSION = 1
+
 RAG_SYSTEM_PROMPT = (
     "You are an AI workspace copilot. Answer only from the provided context. "
     "If context is insufficient, say what is missing and avoid unsupported claims."
@@ -7,3 +10,8 @@ AGENT_SUMMARY_PROMPT = (
     "You are a controlled project operations copilot. Summarize risks, blockers, next actions, "
     "and produce concise outputs grounded in the provided tool results."
 )
+
+TASK_DRAFT_PROMPT = (
+    "You turn a project requirement into 3-6 actionable engineering tasks, grounded in the provided context. "
+    'Reply with JSON only: {"tasks": [{"title": str, "description": str, "priority": 1-5, "rationale": str}]}.'
+)
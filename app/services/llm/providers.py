@@ -1,23 +1,47 @@
 from __future__ import annotations
 
-from collections.abc import Sequence
+import asyncio
+from collections.abc import AsyncIterator, Sequence
+import json
+
+from app.core.config import settings
+from app.services.llm.http import (
+    DEFAULT_ENDPOINT,
+    LLMEndpoint,
+    LLMProviderError,
+    apost_json,
+    astream_json_events,
+    transport,
+)
+from app.services.llm.prompts import AGENT_SUMMARY_PROMPT, RAG_SYSTEM_PROMPT, TASK_DRAFT_PROMPT
+
+
+NO_CONTEXT_ANSWER = "I could not find enough indexed workspace knowledge to answer this question."
 
 
 class BaseLLMProvider:
     def generate_answer(self, question: str, contexts: Sequence[dict]) -> str:
         raise NotImplementedError
 
+    async def stream_answer(self, question: str, contexts: Sequence[dict]) -> AsyncIterator[str]:
+        # Providers without native streaming send the whole answer as a single piece.
+        yield await asyncio.to_thread(self.generate_answer, question, contexts)
+
     def summarize_agent_run(self, goal: str, tool_outputs: Sequence[dict]) -> str:
         raise NotImplementedError
 
     def draft_tasks(self, requirement: str, contexts: Sequence[dict]) -> list[dict]:
         raise NotImplementedError
 
+    async def acall(self, method: str, *args):
+        # Providers with async I/O override this, so a call that loses a hedged race is actually cancelled.
+        return await asyncio.to_thread(getattr(self, method), *args)
+
 
 class DeterministicLLMProvider(BaseLLMProvider):
     def generate_answer(self, question: str, contexts: Sequence[dict]) -> str:
         if not contexts:
-            return "I could not find enough indexed workspace knowledge to answer this question."
+            return NO_CONTEXT_ANSWER
         lines = [f"Question: {question}", "Relevant workspace knowledge:"]
         for index, item in enumerate(contexts[:3], start=1):
             snippet = item["content"][:220]
@@ -57,3 +81,93 @@ class DeterministicLLMProvider(BaseLLMProvider):
                 "rationale": "The project should demonstrate engineering rigor, not only generated output.",
             },
         ]
+
+
+def _format_contexts(contexts: Sequence[dict]) -> str:
+    return "\n\n".join(
+        f"[{index}] {item['filename']}\n{item['content']}" for index, item in enumerate(contexts, start=1)
+    )
+
+
+class OpenAICompatibleProvider(BaseLLMProvider):
+    def __init__(self, model: str, endpoint: LLMEndpoint = DEFAULT_ENDPOINT) -> None:
+        self.model = model
+        self.endpoint = endpoint
+
+    def _payload(self, system_prompt: str, user_prompt: str, **options) -> dict:
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": settings.llm_temperature,
+            **options,
+        }
+
+    async def _complete(self, system_prompt: str, user_prompt: str, **options) -> str:
+        payload = self._payload(system_prompt, user_prompt, **options)
+        data = await apost_json("/chat/completions", payload, self.endpoint)
+        try:
+            return data["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError) as exc:
+            raise LLMProviderError("LLM response did not contain a message") from exc
+
+    async def acall(self, method: str, *args):
+        return await getattr(self, f"_{method}")(*args)
+
+    def generate_answer(self, question: str, contexts: Sequence[dict]) -> str:
+        return transport.run_sync(self._generate_answer(question, contexts))
+
+    def summarize_agent_run(self, goal: str, tool_outputs: Sequence[dict]) -> str:
+        return transport.run_sync(self._summarize_agent_run(goal, tool_outputs))
+
+    def draft_tasks(self, requirement: str, contexts: Sequence[dict]) -> list[dict]:
+        return transport.run_sync(self._draft_tasks(requirement, contexts))
+
+    async def _generate_answer(self, question: str, contexts: Sequence[dict]) -> str:
+        if not contexts:
+            return NO_CONTEXT_ANSWER
+        return await self._complete(
+            RAG_SYSTEM_PROMPT, f"Context:\n{_format_contexts(contexts)}\n\nQuestion: {question}"
+        )
+
+    async def stream_answer(self, question: str, contexts: Sequence[dict]) -> AsyncIterator[str]:
+        if not contexts:
+            yield NO_CONTEXT_ANSWER
+            return
+        payload = self._payload(
+            RAG_SYSTEM_PROMPT,
+            f"Context:\n{_format_contexts(contexts)}\n\nQuestion: {question}",
+            stream=True,
+        )
+        async for event in astream_json_events("/chat/completions", payload, self.endpoint):
+            choices = event.get("choices") or [{}]
+            if delta := (choices[0].get("delta") or {}).get("content"):
+                yield delta
+
+    async def _summarize_agent_run(self, goal: str, tool_outputs: Sequence[dict]) -> str:
+        results = "\n".join(f"- {item['tool_name']}: {item['summary']}" for item in tool_outputs)
+        results = results or "- No tools were executed."
+        return await self._complete(AGENT_SUMMARY_PROMPT, f"Goal: {goal}\n\nTool results:\n{results}")
+
+    async def _draft_tasks(self, requirement: str, contexts: Sequence[dict]) -> list[dict]:
+        content = await self._complete(
+            TASK_DRAFT_PROMPT,
+            f"Requirement:\n{requirement}\n\nContext:\n{_format_contexts(contexts) or 'none'}",
+            response_format={"type": "json_object"},
+        )
+        try:
+            tasks = json.loads(content)["tasks"]
+            return [
+                {
+                    "title": str(task["title"])[:200],
+                    "description": str(task.get("description", "")),
+                    "priority": max(1, min(5, int(task.get("priority", 3)))),
+                    "rationale": str(task.get("rationale", "")),
+                }
+                for task in tasks
+                if task.get("title")
+            ]
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            raise LLMProviderError("LLM returned malformed task drafts") from exc
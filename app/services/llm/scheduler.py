@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import math
+import threading
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.redis_client import redis_client
+from app.core.telemetry import metrics
+from app.services.rag.tokenizer import count_tokens
+
+SCHEDULER_POLL_SECONDS = 0.05
+
+ADMITTED = 1
+WORKSPACE_FULL = -1
+GLOBAL_FULL = -2
+TPM_EXHAUSTED = -3
+
+# Atomic admission across API processes: expired leases are dropped, then both concurrency limits and the
+# workspace's tokens-per-minute budget are checked before the lease is recorded and the tokens charged.
+ADMIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[4]) then return -1 end
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[5]) then return -2 end
+local budget = tonumber(ARGV[7])
+local used = tonumber(redis.call('GET', KEYS[3]) or '0')
+if budget > 0 and used > 0 and used + tonumber(ARGV[6]) > budget then return -3 end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[3])
+redis.call('INCRBY', KEYS[3], ARGV[6])
+redis.call('EXPIRE', KEYS[3], 120)
+return 1
+"""
+
+_admit = redis_client.register_script(ADMIT_SCRIPT)
+logger = get_logger(__name__)
+
+
+class AIThrottled(Exception):
+    def __init__(self, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Waiter:
+    workspace_id: int
+    cost: int
+    token: str = field(default_factory=lambda: uuid.uuid4().hex)
+    granted: threading.Event = field(default_factory=threading.Event)
+    blocked_by: int = 0
+
+
+def _slots_key(workspace_id: int) -> str:
+    return f"ai:slots:ws:{workspace_id}"
+
+
+def _tpm_key(workspace_id: int, minute: int) -> str:
+    return f"ai:tpm:ws:{workspace_id}:{minute}"
+
+
+GLOBAL_SLOTS_KEY = "ai:slots:global"
+
+
+def _seconds_to_next_minute() -> int:
+    return max(1, 60 - int(time.time()) % 60)
+
+
+def estimate_request_tokens(text: str, llm_calls: int = 1) -> int:
+    # Charged up front: the prompt text plus a full context budget and an expected answer per LLM call.
+    per_call = settings.ai_context_token_budget + settings.ai_output_tokens_estimate
+    return count_tokens(text) + per_call * max(1, llm_calls)
+
+
+class FairShareScheduler:
+    """Deficit round robin over per-workspace queues; Redis holds the limits shared by all processes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._queues: dict[int, deque[_Waiter]] = {}
+        self._ring: deque[int] = deque()
+        self._deficit: dict[int, float] = {}
+        self._ticker: threading.Thread | None = None
+
+    def _try_admit(self, waiter: _Waiter) -> int:
+        now = time.time()
+        return int(
+            _admit(
+                keys=[_slots_key(waiter.workspace_id), GLOBAL_SLOTS_KEY, _tpm_key(waiter.workspace_id, int(now // 60))],
+                args=[
+                    now,
+                    now + settings.ai_lease_seconds,
+                    waiter.token,
+                    settings.ai_workspace_concurrency,
+                    settings.ai_global_concurrency,
+                    waiter.cost,
+                    settings.ai_workspace_tpm,
+                ],
+            )
+        )
+
+    def _drop_workspace(self, workspace_id: int) -> None:
+        self._queues.pop(workspace_id, None)
+        self._deficit.pop(workspace_id, None)
+        if workspace_id in self._ring:
+            self._ring.remove(workspace_id)
+
+    def _dispatch(self) -> None:
+        # Each visit credits a workspace quantum * weight tokens; its head request runs once the credit covers
+        # its cost. A tenant with many queued requests therefore gets the same share as one with a single request.
+        progress = True
+        while self._ring and progress:
+            progress = False
+            for _ in range(len(self._ring)):
+                workspace_id = self._ring[0]
+                self._ring.rotate(-1)
+                queue = self._queues[workspace_id]
+                head = queue[0]
+                # Clamped so every visit adds credit; a zero or negative setting would otherwise spin forever.
+                weight = max(1.0, settings.ai_workspace_weights.get(workspace_id, 1.0))
+                credit = self._deficit.get(workspace_id, 0.0) + max(1, settings.ai_drr_quantum_tokens) * weight
+                if head.cost > credit:
+                    self._deficit[workspace_id] = credit
+                    progress = True
+                    continue
+                result = self._try_admit(head)
+                if result == GLOBAL_FULL:
+                    # Keep the earned credit: this workspace is first in line when capacity frees up.
+                    self._deficit[workspace_id] = head.cost
+                    return
+                if result != ADMITTED:
+                    # Blocked by its own limits: hold the credit at the head's cost so it cannot bank a burst.
+                    head.blocked_by = result
+                    self._deficit[workspace_id] = head.cost
+                    continue
+                queue.popleft()
+                head.granted.set()
+                progress = True
+                if queue:
+                    self._deficit[workspace_id] = credit - head.cost
+                else:
+                    self._drop_workspace(workspace_id)
+
+    def _ensure_ticker(self) -> None:
+        # Called under the lock; the ticker is started on first use so importing the module spawns nothing.
+        if self._ticker is None or not self._ticker.is_alive():
+            self._ticker = threading.Thread(target=self._tick, name="ai-scheduler", daemon=True)
+            self._ticker.start()
+
+    def _tick(self) -> None:
+        # One dispatcher per process picks up capacity released by other processes, which cannot signal this
+        # one. Waiters only block on their own event, so the polling cost does not grow with the queue depth.
+        while True:
+            time.sleep(SCHEDULER_POLL_SECONDS)
+            try:
+                with self._lock:
+                    if self._ring:
+                        self._dispatch()
+            except Exception:
+                logger.exception("AI scheduler dispatch failed")
+
+    def acquire(self, workspace_id: int, cost: int) -> str:
+        waiter = _Waiter(workspace_id=workspace_id, cost=cost)
+        with self._lock:
+            queue = self._queues.get(workspace_id)
+            if queue is not None and len(queue) >= settings.ai_queue_max_depth:
+                metrics.incr(f"ai_throttled:ws:{workspace_id}")
+                raise AIThrottled("Too many AI requests queued for this workspace", retry_after=1)
+            if queue is None:
+                queue = self._queues[workspace_id] = deque()
+                self._ring.append(workspace_id)
+            queue.append(waiter)
+            self._ensure_ticker()
+            self._dispatch()
+
+        if waiter.granted.wait(settings.ai_queue_timeout_seconds):
+            return waiter.token
+        with self._lock:
+            if waiter.granted.is_set():
+                return waiter.token
+            queue = self._queues.get(workspace_id)
+            if queue is not None:
+                queue.remove(waiter)
+                if not queue:
+                    self._drop_workspace(workspace_id)
+            metrics.incr(f"ai_throttled:ws:{workspace_id}")
+            if waiter.blocked_by == TPM_EXHAUSTED:
+                raise AIThrottled("Workspace token budget exhausted", retry_after=_seconds_to_next_minute())
+            raise AIThrottled(
+                "AI capacity is busy, retry shortly",
+                retry_after=max(1, math.ceil(settings.ai_queue_timeout_seconds / 2)),
+            )
+
+    def release(self, workspace_id: int, token: str) -> None:
+        pipe = redis_client.pipeline()
+        pipe.zrem(_slots_key(workspace_id), token)
+        pipe.zrem(GLOBAL_SLOTS_KEY, token)
+        pipe.execute()
+        with self._lock:
+            self._dispatch()
+
+
+scheduler = FairShareScheduler()
+
+
+def acquire_ai_slot(workspace_id: int, cost: int) -> str | None:
+    if not settings.ai_limit_enabled:
+        return None
+    return scheduler.acquire(workspace_id, cost)
+
+
+def release_ai_slot(workspace_id: int, token: str | None) -> None:
+    if token is not None:
+        scheduler.release(workspace_id, token)
+
+
+@contextmanager
+def fair_share_slot(workspace_id: int, cost: int) -> Iterator[None]:
+    token = acquire_ai_slot(workspace_id, cost)
+    try:
+        yield
+    finally:
+        release_ai_slot(workspace_id, token)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from concurrent.futures import Future
+import threading
+import time
+from typing import Any
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.core.telemetry import metrics
+from app.services.cache import cache_get_json, cache_set_json
+
+SINGLEFLIGHT_POLL_SECONDS = 0.05
+
+_calls: dict[str, Future] = {}
+_calls_lock = threading.Lock()
+
+
+def _run_across_processes(key: str, compute: Callable[[], Any]) -> Any:
+    result_key = f"{key}:inflight"
+    lock = redis_client.lock(f"lock:{key}", timeout=settings.llm_singleflight_lock_seconds)
+    if lock.acquire(blocking=False):
+        try:
+            value = compute()
+            # Short-lived hand-off for followers in other processes, independent of the response cache.
+            cache_set_json(result_key, value, settings.llm_singleflight_lock_seconds)
+            return value
+        finally:
+            try:
+                lock.release()
+            except Exception:
+                pass
+
+    # Another process owns the upstream call: wait for its result instead of sending a duplicate.
+    metrics.incr("llm_singleflight_remote_waits")
+    deadline = time.monotonic() + settings.llm_singleflight_wait_seconds
+    while time.monotonic() < deadline:
+        value = cache_get_json(result_key)
+        if value is not None:
+            return value
+        if not lock.locked():
+            break
+        time.sleep(SINGLEFLIGHT_POLL_SECONDS)
+    value = cache_get_json(result_key)
+    if value is not None:
+        return value
+    # The leader failed or timed out; fall back to our own call rather than failing the request.
+    return compute()
+
+
+def coalesce(key: str, compute: Callable[[], Any]) -> Any:
+    with _calls_lock:
+        future = _calls.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _calls[key] = future
+    if not leader:
+        metrics.incr("llm_singleflight_shared")
+        return future.result()
+
+    try:
+        value = _run_across_processes(key, compute)
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    else:
+        future.set_result(value)
+        return value
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
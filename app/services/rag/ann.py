@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import math
+
+import numpy as np
+
+ASSIGN_BLOCK_ROWS = 65536
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+
+
+@dataclass
+class IVFIndex:
+    # IVF-flat: rows are bucketed by nearest centroid; `order[offsets[i]:offsets[i + 1]]` is list i.
+    centroids: np.ndarray
+    lists: np.ndarray
+    order: np.ndarray
+    offsets: np.ndarray
+
+
+def choose_list_count(rows: int) -> int:
+    return int(min(4096, max(16, round(math.sqrt(rows)))))
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    lists = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        lists[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return lists
+
+
+def train_centroids(vectors: np.ndarray, live_rows: np.ndarray, list_count: int, seed: int = 0) -> np.ndarray:
+    # Spherical k-means on a sample of live rows; vectors are already L2-normalized.
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(live_rows), list_count * KMEANS_SAMPLE_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(live_rows, size=sample_size, replace=False))], dtype=np.float32)
+    list_count = min(list_count, len(sample))
+    centroids = sample[rng.choice(len(sample), size=list_count, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=list_count)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty lists from random sample rows so every list stays useful.
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+def build_ivf(centroids: np.ndarray, lists: np.ndarray) -> IVFIndex:
+    order = np.argsort(lists, kind="stable")
+    offsets = np.searchsorted(lists[order], np.arange(len(centroids) + 1))
+    return IVFIndex(centroids=centroids, lists=lists, order=order, offsets=offsets)
+
+
+def probe_rows(index: IVFIndex, query_vector: np.ndarray, nprobe: int) -> np.ndarray:
+    nprobe = max(1, min(nprobe, len(index.centroids)))
+    centroid_scores = index.centroids @ query_vector
+    probed = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+    return np.concatenate([index.order[index.offsets[i]:index.offsets[i + 1]] for i in probed])
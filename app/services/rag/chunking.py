@@ -1,28 +1,110 @@
 from __future__ import annotations
 
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+import re
+
 from app.core.config import settings
 
+# Sentence ends: ASCII terminators (plus closing quotes/brackets) before whitespace, or CJK full stops.
+SENTENCE_END_PATTERN = re.compile(r"[.!?][\"')\]]*(?=\s)|[\u3002\uff01\uff1f]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+PARAGRAPH_PATTERN = re.compile(r"\r?\n[ \t]*\r?\n")
+
+
+@dataclass(frozen=True)
+class ChunkSpan:
+    # Character offsets into the original text; text == original[start:end].
+    start: int
+    end: int
+    text: str
+
+
+def _window_sizes(chunk_size: int | None, overlap: int | None) -> tuple[int, int]:
+    # Both in characters. The defaults give chunks about as long as the former ~116-word windows, since a
+    # window usually ends at a boundary in its back half.
+    size = max(1, chunk_size or settings.ai_chunk_chars)
+    step_overlap = overlap if overlap is not None else settings.ai_chunk_overlap_chars
+    if step_overlap >= size:
+        step_overlap = size // 4
+    return size, max(0, step_overlap)
+
+
+def _boundary(buffer: str, start: int, limit: int) -> int:
+    # Latest paragraph break, then sentence end, then whitespace in the back half of the window.
+    # The floor is past `start`, so every chunk consumes at least one character (even with chunk_size=1).
+    floor = start + max(1, (limit - start) // 2)
+    paragraph = -1
+    for match in PARAGRAPH_PATTERN.finditer(buffer, floor, limit):
+        paragraph = match.start()
+    if paragraph != -1:
+        return paragraph
+    sentence_end = -1
+    for match in SENTENCE_END_PATTERN.finditer(buffer, floor, limit):
+        sentence_end = match.end()
+    if sentence_end != -1:
+        return sentence_end
+    for index in range(limit - 1, floor - 1, -1):
+        if buffer[index].isspace():
+            return index
+    return limit
+
+
+def _next_start(buffer: str, start: int, end: int, overlap: int) -> int:
+    if overlap == 0:
+        return end
+    # Step back by the overlap, then forward to a word start so the overlap never begins mid-word.
+    candidate = max(start + 1, end - overlap)
+    match = WHITESPACE_PATTERN.search(buffer, candidate, end)
+    return match.end() if match else candidate
+
+
+def iter_chunk_spans(
+    blocks: Iterable[str],
+    chunk_size: int | None = None,
+    overlap: int | None = None,
+) -> Iterator[ChunkSpan]:
+    # Streams over text blocks; only the unconsumed tail is kept, and each chunk is sliced exactly once.
+    size, overlap = _window_sizes(chunk_size, overlap)
+    buffer = ""
+    base = 0
+    cursor = 0
+    emitted_end = 0
+    exhausted = False
+    block_iter = iter(blocks)
+    while True:
+        if not exhausted and len(buffer) - cursor <= size:
+            block = next(block_iter, None)
+            if block is None:
+                exhausted = True
+            else:
+                if block:
+                    base += cursor
+                    buffer = buffer[cursor:] + block
+                    emitted_end -= cursor
+                    cursor = 0
+                continue
+
+        if len(buffer) - cursor > size:
+            end = _boundary(buffer, cursor, cursor + size)
+        else:
+            end = len(buffer)
+
+        start = cursor
+        while start < end and buffer[start].isspace():
+            start += 1
+        stop = end
+        while stop > start and buffer[stop - 1].isspace():
+            stop -= 1
+        # At the tail, a window that adds nothing past the previous chunk is all overlap.
+        if stop > start and stop > emitted_end:
+            yield ChunkSpan(base + start, base + stop, buffer[start:stop])
+            emitted_end = stop
+
+        if end >= len(buffer) and exhausted:
+            return
+        cursor = _next_start(buffer, start, end, overlap) if end > start else end
+
 
 def split_text(text: str, chunk_size: int | None = None, overlap: int | None = None) -> list[str]:
-    size = chunk_size or settings.ai_chunk_size
-    step_overlap = overlap or settings.ai_chunk_overlap
-    words = text.split()
-    if not words:
-        return []
-
-    target_words = max(80, size // 6)
-    overlap_words = max(10, step_overlap // 6)
-    if overlap_words >= target_words:
-        overlap_words = max(10, target_words // 4)
-
-    chunks: list[str] = []
-    start_index = 0
-    while start_index < len(words):
-        end_index = min(len(words), start_index + target_words)
-        chunk = " ".join(words[start_index:end_index]).strip()
-        if chunk:
-            chunks.append(chunk)
-        if end_index == len(words):
-            break
-        start_index = max(end_index - overlap_words, start_index + 1)
-    return chunks
+    return [span.text for span in iter_chunk_spans([text], chunk_size, overlap)]
@@ -13,6 +13,8 @@ def build_citations(retrieved_chunks: list[dict]) -> list[CitationOut]:
                 filename=chunk["filename"],
                 chunk_id=chunk["chunk_id"],
                 snippet=snippet,
+                start_offset=chunk.get("start_offset"),
+                end_offset=chunk.get("end_offset"),
             )
         )
     return citations
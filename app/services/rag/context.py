@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Sequence
+
+from app.core.config import settings
+from app.services.rag.tokenizer import count_tokens, truncate_to_tokens
+
+# Spans of one document closer than this many characters are treated as adjacent and merged.
+ADJACENT_GAP_CHARS = 4
+MIN_PARTIAL_TOKENS = 32
+
+
+def _uncovered(start: int, end: int, covered: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    pieces: list[tuple[int, int]] = []
+    cursor = start
+    for covered_start, covered_end in sorted(covered):
+        if covered_end <= cursor or covered_start >= end:
+            continue
+        if covered_start > cursor:
+            pieces.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+    if cursor < end:
+        pieces.append((cursor, end))
+    return pieces
+
+
+def _merge_block(block: dict, chunk: dict) -> None:
+    if chunk["start_offset"] < block["end_offset"]:
+        # Overlap from the chunker: append only the part past the block's end.
+        block["content"] += chunk["content"][block["end_offset"] - chunk["start_offset"]:]
+    else:
+        block["content"] += "\n" + chunk["content"]
+    block["end_offset"] = max(block["end_offset"], chunk["end_offset"])
+    block["score"] = max(block["score"], chunk["score"])
+    block["chunk_ids"].append(chunk["chunk_id"])
+
+
+def pack_contexts(chunks: Sequence[dict], token_budget: int | None = None) -> list[dict]:
+    budget = token_budget if token_budget is not None else settings.ai_context_token_budget
+    remaining = budget
+    selected: list[dict] = []
+    covered: dict[int, list[tuple[int, int]]] = defaultdict(list)
+
+    # Greedy by score: a chunk costs only the tokens it adds beyond text already selected from its document.
+    for chunk in sorted(chunks, key=lambda item: item["score"], reverse=True):
+        start, end = chunk.get("start_offset"), chunk.get("end_offset")
+        partial = False
+        if start is None or end is None:
+            start = None
+            cost = count_tokens(chunk["content"])
+        else:
+            pieces = _uncovered(start, end, covered[chunk["document_id"]])
+            if not pieces:
+                continue
+            partial = pieces != [(start, end)]
+            cost = sum(count_tokens(chunk["content"][a - start:b - start]) for a, b in pieces)
+
+        if cost > remaining:
+            if partial or remaining < MIN_PARTIAL_TOKENS:
+                continue
+            # Nothing of this chunk is selected yet: keep its leading part to fill the rest of the budget.
+            content = truncate_to_tokens(chunk["content"], remaining)
+            chunk = {**chunk, "content": content}
+            if start is not None:
+                chunk["end_offset"] = start + len(content)
+            cost = count_tokens(content)
+
+        selected.append(chunk)
+        remaining -= cost
+        if start is not None:
+            covered[chunk["document_id"]].append((start, chunk["end_offset"]))
+        if remaining <= 0:
+            break
+
+    packed: list[dict] = []
+    by_document: dict[int, list[dict]] = defaultdict(list)
+    for chunk in selected:
+        if chunk.get("start_offset") is None:
+            packed.append({**chunk, "chunk_ids": [chunk["chunk_id"]]})
+        else:
+            by_document[chunk["document_id"]].append(chunk)
+
+    for document_chunks in by_document.values():
+        document_chunks.sort(key=lambda item: item["start_offset"])
+        block: dict | None = None
+        for chunk in document_chunks:
+            if block is not None and chunk["start_offset"] <= block["end_offset"] + ADJACENT_GAP_CHARS:
+                _merge_block(block, chunk)
+                continue
+            block = {**chunk, "chunk_ids": [chunk["chunk_id"]]}
+            packed.append(block)
+
+    packed.sort(key=lambda item: item["score"], reverse=True)
+    return packed
@@ -1,6 +1,68 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
+from functools import lru_cache
+import zlib
 
-def estimate_token_count(text: str) -> int:
-    # MVP: use a stable approximation until a real tokenizer/embedding backend is plugged in.
-    return max(1, len(text.split()))
+import numpy as np
+
+from app.core.config import settings
+from app.services.rag.index import extract_terms
+
+
+class BaseEmbeddingBackend:
+    dim: int
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class HashingEmbeddingBackend(BaseEmbeddingBackend):
+    """Offline feature-hashing vectorizer: terms plus character n-grams, signed and L2-normalized."""
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+
+    def _features(self, text: str) -> tuple[list[int], list[float]]:
+        columns: list[int] = []
+        weights: list[float] = []
+        for term in extract_terms(text):
+            grams = [term]
+            # Character n-grams give some recall across inflections; CJK runs use bigrams.
+            size = 2 if any("\u4e00" <= char <= "\u9fff" for char in term) else 3
+            padded = f"<{term}>"
+            grams.extend(padded[i:i + size] for i in range(len(padded) - size + 1))
+            for position, gram in enumerate(grams):
+                digest = zlib.crc32(gram.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                columns.append(digest % self.dim)
+                weights.append(sign if position == 0 else sign * 0.5)
+        return columns, weights
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            columns, weights = self._features(text)
+            if columns:
+                np.add.at(matrix[row], columns, weights)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+@lru_cache(maxsize=1)
+def get_embedding_backend() -> BaseEmbeddingBackend:
+    backend_name = settings.ai_embedding_backend.lower()
+    if backend_name == "hashing":
+        return HashingEmbeddingBackend(settings.ai_embedding_dim)
+    raise ValueError(f"Unsupported embedding backend: {settings.ai_embedding_backend}")
+
+
+def embed_texts(texts: Sequence[str]) -> np.ndarray:
+    backend = get_embedding_backend()
+    if not texts:
+        return np.zeros((0, backend.dim), dtype=np.float32)
+    batch_size = max(1, settings.ai_embedding_batch_size)
+    return np.vstack(
+        [backend.embed_batch(texts[start:start + batch_size]) for start in range(0, len(texts), batch_size)]
+    )
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterable, Sequence
+import heapq
+import math
+import re
+
+from sqlalchemy import Connection, Engine, delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document import (
+    Document,
+    DocumentChunk,
+    DocumentChunkTerm,
+    DocumentStatus,
+    SearchTerm,
+    WorkspaceSearchStats,
+)
+
+TERM_PATTERN = re.compile(r"[a-zA-Z0-9_\-\u4e00-\u9fff]+")
+MAX_TERM_LENGTH = 64
+
+# BM25 parameters (Robertson/Sparck Jones defaults).
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Term ids never change once assigned, so the process-local map only needs a size cap.
+TERM_ID_CACHE_SIZE = 200_000
+TERM_LOOKUP_BATCH = 500
+_term_ids: dict[str, int] = {}
+
+
+def extract_terms(text: str) -> list[str]:
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TERM_PATTERN.findall(text.lower())
+        if len(token) > 1
+    ]
+
+
+def _remember_term_ids(mapping: dict[str, int]) -> None:
+    if len(_term_ids) + len(mapping) > TERM_ID_CACHE_SIZE:
+        _term_ids.clear()
+    _term_ids.update(mapping)
+
+
+def _select_term_ids(connection: Connection | Session, terms: Sequence[str]) -> dict[str, int]:
+    found: dict[str, int] = {}
+    for start in range(0, len(terms), TERM_LOOKUP_BATCH):
+        batch = terms[start:start + TERM_LOOKUP_BATCH]
+        stmt = select(SearchTerm.term, SearchTerm.id).where(SearchTerm.term.in_(batch))
+        found.update({row.term: row.id for row in connection.execute(stmt).all()})
+    return found
+
+
+def lookup_term_ids(db: Session, terms: Iterable[str]) -> dict[str, int]:
+    wanted = set(terms)
+    found = {term: _term_ids[term] for term in wanted if term in _term_ids}
+    loaded = _select_term_ids(db, sorted(wanted - found.keys()))
+    _remember_term_ids(loaded)
+    found.update(loaded)
+    return found
+
+
+def _committed_term_ids(engine: Engine, terms: Sequence[str]) -> dict[str, int]:
+    # A fresh connection: the ingest transaction's snapshot may predate rows other ingests just committed.
+    with engine.connect() as connection:
+        return _select_term_ids(connection, terms)
+
+
+def intern_terms(db: Session, terms: Iterable[str]) -> dict[str, int]:
+    # Terms are global, so new ones are inserted and committed in a short transaction of their own before any
+    # posting refers to them. Inside the (multi-batch) ingest transaction their rows would stay locked until
+    # the document finished, and two ingests sharing new vocabulary could deadlock on each other's rows.
+    wanted = set(terms)
+    term_ids = lookup_term_ids(db, wanted)
+    missing = sorted(wanted - term_ids.keys())
+    engine = db.get_bind()
+    while missing:
+        try:
+            with engine.begin() as connection:
+                connection.execute(insert(SearchTerm), [{"term": term} for term in missing])
+        except IntegrityError:
+            # Another ingest committed some of these first and the whole batch rolled back:
+            # pick up the conflicting ids, then insert whatever is still missing.
+            resolved = _committed_term_ids(engine, missing)
+            if not resolved:
+                raise
+        else:
+            resolved = _committed_term_ids(engine, missing)
+        _remember_term_ids(resolved)
+        term_ids.update(resolved)
+        missing = sorted(wanted - term_ids.keys())
+    return term_ids
+
+
+def _get_stats(db: Session, workspace_id: int, *, for_update: bool = False) -> WorkspaceSearchStats:
+    stmt = select(WorkspaceSearchStats).where(WorkspaceSearchStats.workspace_id == workspace_id)
+    if for_update:
+        stmt = stmt.with_for_update()
+    stats = db.execute(stmt).scalar_one_or_none()
+    if stats is None:
+        stats = WorkspaceSearchStats(workspace_id=workspace_id, chunk_count=0, term_total=0)
+        db.add(stats)
+        db.flush()
+    return stats
+
+
+def _indexed_term_counts(db: Session, posting_filter) -> list[int]:
+    # Only chunks that have postings were ever added to the stats; chunks written before the inverted index
+    # existed, or with no terms at all, must not be subtracted from them either.
+    indexed = select(DocumentChunkTerm.chunk_id).where(posting_filter).distinct()
+    return db.execute(select(DocumentChunk.term_count).where(DocumentChunk.id.in_(indexed))).scalars().all()
+
+
+def remove_document_postings(db: Session, document: Document) -> None:
+    rows = _indexed_term_counts(db, DocumentChunkTerm.document_id == document.id)
+    db.execute(delete(DocumentChunkTerm).where(DocumentChunkTerm.document_id == document.id))
+    if rows:
+        stats = _get_stats(db, document.workspace_id, for_update=True)
+        stats.chunk_count = max(0, stats.chunk_count - len(rows))
+        stats.term_total = max(0, stats.term_total - sum(rows))
+
+
+def remove_chunk_postings(db: Session, workspace_id: int, chunk_ids: Sequence[int]) -> None:
+    for start in range(0, len(chunk_ids), TERM_LOOKUP_BATCH):
+        batch = list(chunk_ids[start:start + TERM_LOOKUP_BATCH])
+        rows = _indexed_term_counts(db, DocumentChunkTerm.chunk_id.in_(batch))
+        db.execute(delete(DocumentChunkTerm).where(DocumentChunkTerm.chunk_id.in_(batch)))
+        if rows:
+            stats = _get_stats(db, workspace_id, for_update=True)
+            stats.chunk_count = max(0, stats.chunk_count - len(rows))
+            stats.term_total = max(0, stats.term_total - sum(rows))
+
+
+def count_terms(text: str) -> Counter[str]:
+    return Counter(extract_terms(text))
+
+
+def index_chunks(
+    db: Session,
+    document: Document,
+    chunks: Sequence[tuple[int, Counter[str]]],
+) -> None:
+    # Postings: term -> (chunk_id, term frequency), plus workspace-level BM25 statistics.
+    term_ids = intern_terms(db, {term for _, counts in chunks for term in counts})
+    postings: list[dict] = []
+    term_total = 0
+    for chunk_id, counts in chunks:
+        term_total += sum(counts.values())
+        postings.extend(
+            {
+                "workspace_id": document.workspace_id,
+                "document_id": document.id,
+                "chunk_id": chunk_id,
+                "term_id": term_ids[term],
+                "term_freq": freq,
+            }
+            for term, freq in counts.items()
+        )
+    if postings:
+        db.execute(insert(DocumentChunkTerm), postings)
+    # Stats count exactly the chunks that have postings, which is what the removals above subtract.
+    indexed = sum(1 for _, counts in chunks if counts)
+    if indexed:
+        stats = _get_stats(db, document.workspace_id, for_update=True)
+        stats.chunk_count += indexed
+        stats.term_total += term_total
+
+
+def search_postings(
+    db: Session,
+    workspace_id: int,
+    terms: Iterable[str],
+    top_k: int,
+    document_ids: list[int] | None = None,
+) -> list[tuple[float, int]]:
+    query_term_ids = sorted(set(lookup_term_ids(db, terms).values()))
+    if not query_term_ids or top_k <= 0:
+        return []
+
+    stats = db.execute(
+        select(WorkspaceSearchStats).where(WorkspaceSearchStats.workspace_id == workspace_id)
+    ).scalar_one_or_none()
+    if stats is None or stats.chunk_count == 0:
+        return []
+
+    # Document frequencies come straight off the (workspace_id, term_id) index.
+    doc_freq = dict(
+        db.execute(
+            select(DocumentChunkTerm.term_id, func.count())
+            .where(
+                DocumentChunkTerm.workspace_id == workspace_id,
+                DocumentChunkTerm.term_id.in_(query_term_ids),
+            )
+            .group_by(DocumentChunkTerm.term_id)
+        ).all()
+    )
+    total_chunks = stats.chunk_count
+    avg_length = max(stats.term_total / total_chunks, 1.0)
+    idf = {
+        term_id: math.log(1 + (total_chunks - freq + 0.5) / (freq + 0.5))
+        for term_id, freq in doc_freq.items()
+    }
+
+    stmt = (
+        select(
+            DocumentChunkTerm.chunk_id,
+            DocumentChunkTerm.term_id,
+            DocumentChunkTerm.term_freq,
+            DocumentChunk.term_count,
+        )
+        .join(DocumentChunk, DocumentChunk.id == DocumentChunkTerm.chunk_id)
+        .join(Document, Document.id == DocumentChunkTerm.document_id)
+        .where(
+            DocumentChunkTerm.workspace_id == workspace_id,
+            DocumentChunkTerm.term_id.in_(query_term_ids),
+            Document.status == DocumentStatus.INDEXED,
+        )
+        .order_by(DocumentChunkTerm.chunk_id)
+        .execution_options(yield_per=settings.ai_retrieval_stream_batch)
+    )
+    if document_ids:
+        stmt = stmt.where(DocumentChunkTerm.document_id.in_(document_ids))
+
+    # Rows arrive grouped by chunk through a server-side cursor; only the best top_k stay in memory.
+    heap: list[tuple[float, int, int]] = []
+
+    def push(chunk_id: int, score: float) -> None:
+        entry = (score, -chunk_id, chunk_id)
+        if len(heap) < top_k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    current_chunk: int | None = None
+    current_score = 0.0
+    for row in db.execute(stmt):
+        if row.chunk_id != current_chunk:
+            if current_chunk is not None:
+                push(current_chunk, current_score)
+            current_chunk = row.chunk_id
+            current_score = 0.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * row.term_count / avg_length)
+        tf = row.term_freq
+        current_score += idf.get(row.term_id, 0.0) * tf * (BM25_K1 + 1) / (tf + norm)
+    if current_chunk is not None:
+        push(current_chunk, current_score)
+
+    return [(score, chunk_id) for score, _, chunk_id in sorted(heap, reverse=True)]
@@ -1,15 +1,41 @@
 from __future__ import annotations
 
+from collections import Counter, defaultdict, deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import hashlib
+from itertools import islice
 from pathlib import Path
+from typing import BinaryIO
 import uuid
 
-from sqlalchemy import delete
+import numpy as np
+
+from sqlalchemy import bindparam, delete, insert, select, update
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.models.document import Document, DocumentChunk, DocumentStatus, DocumentSourceType
-from app.services.rag.chunking import split_text
-from app.services.rag.embeddings import estimate_token_count
+from app.services.cache import bump_index_version
+from app.services.rag.chunking import ChunkSpan, iter_chunk_spans
+from app.services.rag.embeddings import embed_texts
+from app.services.rag.index import (
+    count_terms,
+    index_chunks,
+    remove_chunk_postings,
+    remove_document_postings,
+)
+from app.services.rag.parsers import (
+    EXTRACTED_FORMATS,
+    DocumentParseError,
+    detect_format,
+    extract_to_sidecar,
+)
+from app.services.rag.tokenizer import count_tokens
+from app.services.rag.vector_store import replace_document_vectors, update_document_vectors
+
+UNSUPPORTED_CONTENT_MESSAGE = "Only UTF-8 text, Markdown, HTML, PDF and DOCX files are supported"
 
 
 def ensure_storage_dir() -> Path:
@@ -18,52 +44,391 @@ def ensure_storage_dir() -> Path:
     return storage
 
 
-def save_uploaded_bytes(filename: str, content: bytes) -> str:
+@dataclass
+class StoredBlob:
+    path: str
+    sha256: str
+    size: int
+
+
+def blob_path(sha256: str) -> Path:
+    return ensure_storage_dir() / "blobs" / sha256[:2] / sha256
+
+
+def store_upload_stream(source: BinaryIO, filename: str) -> StoredBlob:
+    # Fixed-size blocks: memory per upload stays at one block no matter how large the file is.
     storage = ensure_storage_dir()
-    safe_name = f"{uuid.uuid4().hex}_{Path(filename).name}"
-    path = storage / safe_name
-    path.write_bytes(content)
-    return str(path)
+    tmp_path = storage / f".{uuid.uuid4().hex}_{Path(filename).name}.part"
+    digest = hashlib.sha256()
+    size = 0
+    with tmp_path.open("wb") as target:
+        while block := source.read(settings.ai_upload_block_size):
+            digest.update(block)
+            target.write(block)
+            size += len(block)
 
+    # Content-addressed: identical bytes are kept on disk once, whichever document uploaded them.
+    sha256 = digest.hexdigest()
+    path = blob_path(sha256)
+    if path.exists():
+        tmp_path.unlink()
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.replace(path)
+    return StoredBlob(path=str(path), sha256=sha256, size=size)
 
-def ingest_document_content(
+
+def iter_file_text(path: str) -> Iterator[str]:
+    # Incremental UTF-8 decoding; a UnicodeDecodeError surfaces at the offending block.
+    # newline="" keeps CRLF as-is, so chunk offsets index the stored file exactly.
+    with open(path, encoding="utf-8", newline="") as handle:
+        while block := handle.read(settings.ai_upload_block_size):
+            yield block
+
+
+def iter_source_text(path: str, document_format: str) -> Iterator[str]:
+    if document_format in EXTRACTED_FORMATS:
+        # Extracted once into a sidecar file (PDF, HTML and DOCX in a time- and memory-limited process); the
+        # chunker streams that text, so chunk offsets index the sidecar rather than the raw blob.
+        return iter_file_text(str(extract_to_sidecar(path, document_format)))
+    return iter_file_text(path)
+
+
+def iter_document_text(document: Document) -> Iterator[str]:
+    if not document.storage_path:
+        raise ValueError("Document has no persisted storage path")
+    return iter_source_text(document.storage_path, detect_format(document.filename, document.content_type))
+
+
+def chunk_content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PreparedChunk:
+    chunk_index: int
+    content: str
+    content_hash: str
+    start_offset: int
+    end_offset: int
+    token_count: int
+    terms: Counter[str]
+
+
+@dataclass
+class ReusedChunk:
+    chunk_index: int
+    content_hash: str
+    start_offset: int
+    end_offset: int
+    token_count: int
+
+
+@dataclass
+class PreparedChunkBatch:
+    # Unchanged chunks whose stored row, postings and vector are kept; index, offsets and token count may change.
+    reused: list[ReusedChunk]
+    added: list[PreparedChunk]
+    vectors: np.ndarray
+
+
+class StaleChunkPlan(Exception):
+    pass
+
+
+def prepare_chunk(chunk_index: int, span: ChunkSpan) -> PreparedChunk:
+    return PreparedChunk(
+        chunk_index=chunk_index,
+        content=span.text,
+        content_hash=chunk_content_hash(span.text),
+        start_offset=span.start,
+        end_offset=span.end,
+        token_count=count_tokens(span.text),
+        terms=count_terms(span.text),
+    )
+
+
+def load_chunk_hashes(db: Session, document_id: int) -> Counter[str]:
+    return Counter(
+        db.execute(
+            select(DocumentChunk.content_hash).where(
+                DocumentChunk.document_id == document_id,
+                DocumentChunk.content_hash.is_not(None),
+            )
+        ).scalars()
+    )
+
+
+def prepare_reindex_batches(
+    chunks: Iterable[ChunkSpan],
+    known_hashes: Counter[str],
+    batch_size: int | None = None,
+) -> Iterator[PreparedChunkBatch]:
+    # Pure CPU work (hash, tokenize, embed) with no database access, so it can run in a worker process.
+    remaining = Counter(known_hashes)
+    batch_size = max(1, batch_size or settings.ai_ingest_batch_size)
+    reused: list[ReusedChunk] = []
+    added: list[PreparedChunk] = []
+    for chunk_index, span in enumerate(chunks):
+        content_hash = chunk_content_hash(span.text)
+        if remaining[content_hash] > 0:
+            remaining[content_hash] -= 1
+            reused.append(ReusedChunk(chunk_index, content_hash, span.start, span.end, count_tokens(span.text)))
+            continue
+        added.append(prepare_chunk(chunk_index, span))
+        if len(added) >= batch_size:
+            yield PreparedChunkBatch(reused, added, embed_texts([chunk.content for chunk in added]))
+            reused, added = [], []
+    if reused or added:
+        yield PreparedChunkBatch(reused, added, embed_texts([chunk.content for chunk in added]))
+
+
+def _insert_chunk_batch(
     db: Session,
     document: Document,
-    content: str,
+    items: list[PreparedChunk],
+    after_id: int,
+) -> list[int]:
+    # Core executemany: no ORM objects or identity-map bookkeeping per chunk.
+    db.execute(
+        insert(DocumentChunk.__table__),
+        [
+            {
+                "document_id": document.id,
+                "workspace_id": document.workspace_id,
+                "chunk_index": item.chunk_index,
+                "content": item.content,
+                "content_hash": item.content_hash,
+                "start_offset": item.start_offset,
+                "end_offset": item.end_offset,
+                "token_count": item.token_count,
+                "term_count": sum(item.terms.values()),
+            }
+            for item in items
+        ],
+    )
+    # Rows of this document above `after_id` were all written by the current ingest.
+    rows = db.execute(
+        select(DocumentChunk.id, DocumentChunk.chunk_index).where(
+            DocumentChunk.document_id == document.id,
+            DocumentChunk.id > after_id,
+            DocumentChunk.chunk_index.in_([item.chunk_index for item in items]),
+        )
+    ).all()
+    ids_by_index = {row.chunk_index: row.id for row in rows}
+    chunk_ids = [ids_by_index[item.chunk_index] for item in items]
+    index_chunks(db, document, [(chunk_id, item.terms) for chunk_id, item in zip(chunk_ids, items)])
+    return chunk_ids
+
+
+def _discard_vectors(document: Document, chunk_ids: list[int]) -> None:
+    # Vectors appended for chunk rows that were rolled back would otherwise take up top-k slots.
+    if chunk_ids:
+        update_document_vectors(document.workspace_id, document.id, chunk_ids, [], embed_texts([]))
+
+
+def ingest_document_chunks(
+    db: Session,
+    document: Document,
+    chunks: Iterable[ChunkSpan],
 ) -> Document:
     document.status = DocumentStatus.PARSING
     document.error_message = None
+    document.parse_started_at = datetime.now(timezone.utc)
     db.commit()
 
-    chunks = split_text(content)
+    remove_document_postings(db, document)
     db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document.id))
-    db.flush()
-
-    for index, chunk_text in enumerate(chunks):
-        db.add(
-            DocumentChunk(
-                document_id=document.id,
-                workspace_id=document.workspace_id,
-                chunk_index=index,
-                content=chunk_text,
-                token_count=estimate_token_count(chunk_text),
-                metadata_json={
-                    "workspace_id": document.workspace_id,
-                    "document_id": document.id,
-                    "source": document.source_type.value,
-                    "filename": document.filename,
-                },
+
+    # Chunks, postings and vectors are all flushed batch by batch, so neither the streamed source nor its
+    # embeddings are ever held in memory at once. Vectors of not-yet-committed chunks are harmless: search
+    # results are hydrated from committed INDEXED rows only.
+    written_ids: list[int] = []
+    batch_size = max(1, settings.ai_ingest_batch_size)
+    chunk_iter = iter(chunks)
+    try:
+        while batch := list(islice(chunk_iter, batch_size)):
+            items = [
+                prepare_chunk(chunk_index, span) for chunk_index, span in enumerate(batch, start=len(written_ids))
+            ]
+            chunk_ids = _insert_chunk_batch(db, document, items, after_id=0)
+            # The first batch also tombstones the document's previous vectors.
+            update_document_vectors(
+                document.workspace_id,
+                document.id,
+                None if not written_ids else [],
+                chunk_ids,
+                embed_texts([item.content for item in items]),
             )
-        )
+            written_ids.extend(chunk_ids)
+    except BaseException:
+        _discard_vectors(document, written_ids)
+        raise
+    chunk_count = len(written_ids)
 
-    document.chunk_count = len(chunks)
-    document.status = DocumentStatus.INDEXED if chunks else DocumentStatus.FAILED
-    document.error_message = None if chunks else "No parsable content found"
+    document.chunk_count = chunk_count
+    document.status = DocumentStatus.INDEXED if chunk_count else DocumentStatus.FAILED
+    document.error_message = None if chunk_count else "No parsable content found"
     db.commit()
+
+    if chunk_count == 0:
+        replace_document_vectors(document.workspace_id, document.id, [], embed_texts([]))
+    bump_index_version(document.workspace_id)
     db.refresh(document)
     return document
 
 
+def apply_reindex_batches(
+    db: Session,
+    document: Document,
+    batches: Iterable[PreparedChunkBatch],
+) -> Document:
+    # Diff by chunk content hash: unchanged chunks keep their ids, postings and vectors.
+    existing: dict[str, deque[tuple[int, tuple]]] = defaultdict(deque)
+    old_ids: list[int] = []
+    for row in db.execute(
+        select(
+            DocumentChunk.id,
+            DocumentChunk.chunk_index,
+            DocumentChunk.content_hash,
+            DocumentChunk.start_offset,
+            DocumentChunk.end_offset,
+            DocumentChunk.token_count,
+        )
+        .where(DocumentChunk.document_id == document.id)
+        .order_by(DocumentChunk.chunk_index)
+    ):
+        old_ids.append(row.id)
+        # Chunks written before content hashes existed never match and are replaced once.
+        if row.content_hash:
+            existing[row.content_hash].append(
+                (row.id, (row.chunk_index, row.start_offset, row.end_offset, row.token_count))
+            )
+    after_id = max(old_ids, default=0)
+
+    moved: list[dict] = []
+    added_ids: list[int] = []
+    reused: set[int] = set()
+    chunk_count = 0
+    try:
+        for batch in batches:
+            for chunk in batch.reused:
+                candidates = existing.get(chunk.content_hash)
+                if not candidates:
+                    # The batches were planned against chunks that have changed since.
+                    db.rollback()
+                    raise StaleChunkPlan(f"Chunks of document {document.id} changed during reindex")
+                chunk_id, old_position = candidates.popleft()
+                reused.add(chunk_id)
+                if old_position != (chunk.chunk_index, chunk.start_offset, chunk.end_offset, chunk.token_count):
+                    moved.append(
+                        {
+                            "chunk_id": chunk_id,
+                            "new_index": chunk.chunk_index,
+                            "new_start": chunk.start_offset,
+                            "new_end": chunk.end_offset,
+                            "new_token_count": chunk.token_count,
+                        }
+                    )
+            if batch.added:
+                # New vectors are appended per batch; search only returns them once the rows are committed.
+                batch_ids = _insert_chunk_batch(db, document, batch.added, after_id=after_id)
+                update_document_vectors(document.workspace_id, document.id, [], batch_ids, batch.vectors)
+                added_ids.extend(batch_ids)
+            chunk_count += len(batch.reused) + len(batch.added)
+
+        if moved:
+            db.execute(
+                update(DocumentChunk.__table__)
+                .where(DocumentChunk.__table__.c.id == bindparam("chunk_id"))
+                .values(
+                    chunk_index=bindparam("new_index"),
+                    start_offset=bindparam("new_start"),
+                    end_offset=bindparam("new_end"),
+                    token_count=bindparam("new_token_count"),
+                ),
+                moved,
+            )
+        removed_ids = [chunk_id for chunk_id in old_ids if chunk_id not in reused]
+        if removed_ids:
+            remove_chunk_postings(db, document.workspace_id, removed_ids)
+            batch_size = max(1, settings.ai_ingest_batch_size)
+            for start in range(0, len(removed_ids), batch_size):
+                db.execute(delete(DocumentChunk).where(DocumentChunk.id.in_(removed_ids[start:start + batch_size])))
+
+        document.chunk_count = chunk_count
+        document.status = DocumentStatus.INDEXED if chunk_count else DocumentStatus.FAILED
+        document.error_message = None if chunk_count else "No parsable content found"
+        db.commit()
+    except BaseException:
+        _discard_vectors(document, added_ids)
+        raise
+
+    if removed_ids:
+        update_document_vectors(document.workspace_id, document.id, removed_ids, [], embed_texts([]))
+    if added_ids or removed_ids:
+        bump_index_version(document.workspace_id)
+    db.refresh(document)
+    return document
+
+
+def reindex_document_chunks(
+    db: Session,
+    document: Document,
+    chunks: Iterable[ChunkSpan],
+) -> Document:
+    known_hashes = load_chunk_hashes(db, document.id)
+    return apply_reindex_batches(db, document, prepare_reindex_batches(chunks, known_hashes))
+
+
+def ingest_document_content(
+    db: Session,
+    document: Document,
+    content: str,
+) -> Document:
+    return ingest_document_chunks(db, document, iter_chunk_spans([content]))
+
+
+def link_duplicate_document(db: Session, document: Document) -> bool:
+    # Same bytes already indexed in this workspace: share that document's chunks instead of re-chunking.
+    if not document.content_hash:
+        return False
+    canonical = db.execute(
+        select(Document)
+        .where(
+            Document.workspace_id == document.workspace_id,
+            Document.content_hash == document.content_hash,
+            Document.status == DocumentStatus.INDEXED,
+            Document.canonical_document_id.is_(None),
+            Document.id != document.id,
+        )
+        .order_by(Document.id.asc())
+        .limit(1)
+    ).scalar_one_or_none()
+    if canonical is None:
+        return False
+    document.canonical_document_id = canonical.id
+    document.chunk_count = canonical.chunk_count
+    document.status = DocumentStatus.INDEXED
+    document.error_message = None
+    db.commit()
+    bump_index_version(document.workspace_id)
+    db.refresh(document)
+    return True
+
+
+def resolve_document_ids(db: Session, workspace_id: int, document_ids: list[int]) -> list[int]:
+    # Duplicates own no chunks; filtering by them means filtering by the document that holds the chunks.
+    canonical_ids = db.execute(
+        select(Document.canonical_document_id).where(
+            Document.workspace_id == workspace_id,
+            Document.id.in_(document_ids),
+            Document.canonical_document_id.is_not(None),
+        )
+    ).scalars().all()
+    return sorted(set(document_ids) | set(canonical_ids))
+
+
 def create_manual_document(
     db: Session,
     workspace_id: int,
@@ -77,6 +442,7 @@ def create_manual_document(
         uploaded_by=user_id,
         filename=filename,
         storage_path=None,
+        content_hash=hashlib.sha256(content.encode("utf-8")).hexdigest(),
         content_type=content_type,
         source_type=DocumentSourceType.MANUAL,
         status=DocumentStatus.PENDING,
@@ -84,38 +450,76 @@ def create_manual_document(
     db.add(document)
     db.commit()
     db.refresh(document)
+    if link_duplicate_document(db, document):
+        return document
     return ingest_document_content(db, document, content)
 
 
-def create_uploaded_document(
+def create_pending_document(
     db: Session,
     workspace_id: int,
     user_id: int,
     filename: str,
-    content: bytes,
+    blob: StoredBlob,
     content_type: str,
+    source_type: DocumentSourceType,
 ) -> Document:
-    storage_path = save_uploaded_bytes(filename, content)
     document = Document(
         workspace_id=workspace_id,
         uploaded_by=user_id,
         filename=filename,
-        storage_path=storage_path,
+        storage_path=blob.path,
+        content_hash=blob.sha256,
         content_type=content_type,
-        source_type=DocumentSourceType.UPLOAD,
+        source_type=source_type,
         status=DocumentStatus.PENDING,
     )
     db.add(document)
     db.commit()
     db.refresh(document)
+    link_duplicate_document(db, document)
+    return document
+
+
+def _mark_failed(db: Session, document: Document, message: str) -> Document:
+    document.status = DocumentStatus.FAILED
+    document.error_message = message
+    db.commit()
+    bump_index_version(document.workspace_id)
+    db.refresh(document)
+    return document
+
 
+def ingest_stored_document(db: Session, document: Document) -> Document:
+    if document.canonical_document_id is not None:
+        return document
+    if not document.storage_path:
+        return _mark_failed(db, document, "Document has no persisted storage path")
     try:
-        decoded = content.decode("utf-8")
+        return ingest_document_chunks(db, document, iter_chunk_spans(iter_document_text(document)))
     except UnicodeDecodeError:
-        document.status = DocumentStatus.FAILED
-        document.error_message = "Only UTF-8 text-like files are supported in this MVP"
-        db.commit()
-        db.refresh(document)
-        return document
+        db.rollback()
+        return _mark_failed(db, document, UNSUPPORTED_CONTENT_MESSAGE)
+    except DocumentParseError as exc:
+        db.rollback()
+        return _mark_failed(db, document, str(exc))
 
-    return ingest_document_content(db, document, decoded)
+
+def create_uploaded_document(
+    db: Session,
+    workspace_id: int,
+    user_id: int,
+    filename: str,
+    source: BinaryIO,
+    content_type: str,
+) -> Document:
+    document = create_pending_document(
+        db,
+        workspace_id=workspace_id,
+        user_id=user_id,
+        filename=filename,
+        blob=store_upload_stream(source, filename),
+        content_type=content_type,
+        source_type=DocumentSourceType.UPLOAD,
+    )
+    return ingest_stored_document(db, document)
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from html.parser import HTMLParser
+from multiprocessing import get_context
+from pathlib import Path
+import re
+import sys
+import threading
+import uuid
+import zipfile
+from xml.etree import ElementTree
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+# Bump when an extractor changes so cached sidecar text is regenerated.
+EXTRACTOR_VERSION = 1
+MEMORY_EXIT_CODE = 3
+
+FORMAT_BY_EXTENSION = {
+    ".pdf": "pdf",
+    ".html": "html",
+    ".htm": "html",
+    ".docx": "docx",
+    ".md": "markdown",
+    ".markdown": "markdown",
+}
+FORMAT_BY_CONTENT_TYPE = {
+    "application/pdf": "pdf",
+    "text/html": "html",
+    "application/xhtml+xml": "html",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "text/markdown": "markdown",
+    "text/x-markdown": "markdown",
+}
+SANDBOXED_FORMATS = {"pdf", "html", "docx"}
+# Formats chunked from extracted text kept next to the blob, so chunk offsets index a persisted file.
+EXTRACTED_FORMATS = SANDBOXED_FORMATS | {"markdown"}
+
+HTML_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+HTML_BLOCK_TAGS = {
+    "p", "div", "section", "article", "header", "footer", "li", "ul", "ol", "table", "tr",
+    "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "title",
+}
+HTML_BREAK_TAGS = {"br", "hr"}
+DOCX_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+MARKDOWN_FENCE = re.compile(r"^\s*(```|~~~)")
+MARKDOWN_PREFIX = re.compile(r"^\s{0,3}(#{1,6}\s+|>\s?|[-*+]\s+|\d+[.)]\s+)")
+MARKDOWN_IMAGE_OR_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+MARKDOWN_EMPHASIS = re.compile(r"(\*\*|__|\*|_|`)(?=\S)(.+?)(?<=\S)\1")
+
+_parse_slots = threading.BoundedSemaphore(max(1, settings.ai_parser_workers))
+logger = get_logger(__name__)
+
+
+class DocumentParseError(ValueError):
+    pass
+
+
+def detect_format(filename: str, content_type: str | None) -> str:
+    by_extension = FORMAT_BY_EXTENSION.get(Path(filename).suffix.lower())
+    if by_extension:
+        return by_extension
+    mime = (content_type or "").split(";")[0].strip().lower()
+    return FORMAT_BY_CONTENT_TYPE.get(mime, "text")
+
+
+def _iter_lines(blocks: Iterable[str]) -> Iterator[str]:
+    carry = ""
+    for block in blocks:
+        lines = (carry + block).split("\n")
+        carry = lines.pop()
+        yield from lines
+    if carry:
+        yield carry
+
+
+def iter_markdown_text(blocks: Iterable[str]) -> Iterator[str]:
+    in_fence = False
+    for line in _iter_lines(blocks):
+        if MARKDOWN_FENCE.match(line):
+            in_fence = not in_fence
+            continue
+        if not in_fence:
+            line = MARKDOWN_PREFIX.sub("", line)
+            line = MARKDOWN_IMAGE_OR_LINK.sub(r"\1", line)
+            line = MARKDOWN_EMPHASIS.sub(r"\2", line)
+        yield line + "\n"
+
+
+class _HTMLTextExtractor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag in HTML_SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in HTML_BREAK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in HTML_SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in HTML_BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def _extract_html(path: Path) -> Iterator[str]:
+    parser = _HTMLTextExtractor()
+    with path.open(encoding="utf-8", errors="replace") as handle:
+        while block := handle.read(settings.ai_upload_block_size):
+            parser.feed(block)
+            yield "".join(parser.parts)
+            parser.parts.clear()
+    parser.close()
+    yield "".join(parser.parts)
+
+
+def _extract_pdf(path: Path) -> Iterator[str]:
+    from pypdf import PdfReader
+
+    for page in PdfReader(str(path)).pages:
+        yield (page.extract_text() or "") + "\n\n"
+
+
+def _extract_docx(path: Path) -> Iterator[str]:
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as handle:
+        # iterparse keeps memory flat: each paragraph is emitted and cleared as soon as it closes.
+        for _, element in ElementTree.iterparse(handle, events=("end",)):
+            if element.tag == f"{DOCX_NAMESPACE}t":
+                yield element.text or ""
+            elif element.tag == f"{DOCX_NAMESPACE}tab":
+                yield "\t"
+            elif element.tag == f"{DOCX_NAMESPACE}br":
+                yield "\n"
+            elif element.tag == f"{DOCX_NAMESPACE}p":
+                yield "\n\n"
+                element.clear()
+
+
+EXTRACTORS = {
+    "pdf": _extract_pdf,
+    "html": _extract_html,
+    "docx": _extract_docx,
+}
+
+
+def _run_extractor(document_format: str, source_path: str, output_path: str, memory_limit: int, errors) -> None:
+    # Child process entry point: the address-space cap turns a decompression bomb into a MemoryError here.
+    try:
+        import resource
+
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    except (ImportError, ValueError, OSError):
+        pass
+    try:
+        with open(output_path, "w", encoding="utf-8") as output:
+            for text in EXTRACTORS[document_format](Path(source_path)):
+                output.write(text)
+    except MemoryError:
+        sys.exit(MEMORY_EXIT_CODE)
+    except Exception as exc:
+        # Reported through the pipe: the parent logs it, the child's stderr goes nowhere useful.
+        errors.send(f"{type(exc).__name__}: {exc}")
+        sys.exit(1)
+
+
+def sidecar_text_path(source_path: str, document_format: str) -> Path:
+    # The format is part of the name: the same bytes uploaded as .md and .html extract differently.
+    return Path(f"{source_path}.{document_format}.v{EXTRACTOR_VERSION}.txt")
+
+
+def _strip_markdown_to(source_path: str, output_path: Path) -> None:
+    # Markdown is cheap to strip line by line, so it runs in-process instead of going through a sandbox.
+    with open(source_path, encoding="utf-8", newline="") as source, output_path.open(
+        "w", encoding="utf-8", newline=""
+    ) as output:
+        blocks = iter(lambda: source.read(settings.ai_upload_block_size), "")
+        for line in iter_markdown_text(blocks):
+            output.write(line)
+
+
+def extract_to_sidecar(source_path: str, document_format: str) -> Path:
+    # Blobs are content-addressed, so extracted text is too: duplicates and reindexes reuse it.
+    sidecar = sidecar_text_path(source_path, document_format)
+    if sidecar.exists():
+        return sidecar
+    tmp_path = sidecar.with_name(f".{sidecar.name}.{uuid.uuid4().hex}.part")
+    if document_format == "markdown":
+        try:
+            _strip_markdown_to(source_path, tmp_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        tmp_path.replace(sidecar)
+        return sidecar
+    context = get_context("spawn")
+    errors_out, errors_in = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_run_extractor,
+        args=(document_format, source_path, str(tmp_path), settings.ai_parser_memory_mb * 1024 * 1024, errors_in),
+        daemon=True,
+    )
+    # Bounded: at most ai_parser_workers parser processes run at once in this process, and a caller waits
+    # only so long for a free slot instead of piling up behind a backlog.
+    if not _parse_slots.acquire(timeout=settings.ai_parser_queue_timeout_seconds):
+        raise DocumentParseError("Parser busy, retry later")
+    try:
+        process.start()
+        errors_in.close()
+        process.join(settings.ai_parser_timeout_seconds)
+        if process.is_alive():
+            process.kill()
+            process.join()
+            tmp_path.unlink(missing_ok=True)
+            raise DocumentParseError(f"Parsing timed out after {settings.ai_parser_timeout_seconds}s")
+        error = None
+        if process.exitcode != 0 and errors_out.poll():
+            try:
+                error = errors_out.recv()
+            except EOFError:
+                pass
+    finally:
+        errors_out.close()
+        _parse_slots.release()
+    if process.exitcode != 0:
+        tmp_path.unlink(missing_ok=True)
+        if process.exitcode == MEMORY_EXIT_CODE:
+            raise DocumentParseError(f"Parsing exceeded the {settings.ai_parser_memory_mb} MB memory limit")
+        logger.warning(
+            "Parsing %s (%s) failed: %s", source_path, document_format, error or f"exit code {process.exitcode}"
+        )
+        raise DocumentParseError(f"Could not parse {document_format.upper()} document")
+    tmp_path.replace(sidecar)
+    return sidecar
@@ -1,5 +1,34 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
+import heapq
 
-def rerank_chunks(chunks: list[dict]) -> list[dict]:
-    return sorted(chunks, key=lambda item: (item["score"], -item["chunk_id"]), reverse=True)
+
+def _rank_key(item: dict) -> tuple[float, int]:
+    return item["score"], -item["chunk_id"]
+
+
+def rerank_chunks(chunks: list[dict], top_k: int | None = None) -> list[dict]:
+    if top_k is None:
+        return sorted(chunks, key=_rank_key, reverse=True)
+    # Partial selection: O(n log k) instead of sorting every candidate.
+    return heapq.nlargest(top_k, chunks, key=_rank_key)
+
+
+def fuse_rankings(
+    rankings: Sequence[list[tuple[float, int]]],
+    top_k: int,
+    weights: Sequence[float] | None = None,
+    rrf_k: int = 60,
+) -> list[tuple[float, int]]:
+    # Reciprocal rank fusion: only ranks matter, so BM25 and cosine scores need no calibration.
+    weights = weights or [1.0] * len(rankings)
+    fused: dict[int, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, (_, chunk_id) in enumerate(ranking, start=1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + weight / (rrf_k + rank)
+    return heapq.nlargest(
+        top_k,
+        ((score, chunk_id) for chunk_id, score in fused.items()),
+        key=lambda item: (item[0], -item[1]),
+    )
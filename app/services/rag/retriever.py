@@ -1,56 +1,180 @@
 from __future__ import annotations
 
-import re
+from concurrent.futures import ThreadPoolExecutor
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.telemetry import metrics
 from app.models.document import Document, DocumentChunk, DocumentStatus
-from app.services.rag.reranker import rerank_chunks
+from app.services.cache import (
+    LocalLRUCache,
+    cache_get_json,
+    cache_set_json,
+    get_index_version,
+    retrieval_key,
+)
+from app.services.rag.embeddings import embed_texts
+from app.services.rag.index import extract_terms, search_postings
+from app.services.rag.ingest import resolve_document_ids
+from app.services.rag.reranker import fuse_rankings, rerank_chunks
+from app.services.rag.vector_store import search_vectors
 
+# Vector search is pure NumPy (no Session), so it can run beside the lexical query on the caller's Session.
+_vector_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-vector")
+_local_cache = LocalLRUCache(settings.ai_retrieval_cache_local_size)
 
-def _tokenize(text: str) -> set[str]:
-    return {token for token in re.findall(r"[a-zA-Z0-9_\-\u4e00-\u9fff]+", text.lower()) if len(token) > 1}
 
+def _lexical_candidates(
+    db: Session,
+    workspace_id: int,
+    query: str,
+    top_k: int,
+    document_ids: list[int] | None,
+) -> list[tuple[float, int]]:
+    query_terms = extract_terms(query)
+    if not query_terms:
+        return []
+    return search_postings(db, workspace_id, query_terms, top_k, document_ids=document_ids)
 
-def retrieve_workspace_chunks(
+
+def _vector_candidates(
+    workspace_id: int,
+    query: str,
+    top_k: int,
+    document_ids: list[int] | None,
+    nprobe: int | None = None,
+) -> list[tuple[float, int]]:
+    query_vector = embed_texts([query])[0]
+    if not query_vector.any():
+        return []
+    return search_vectors(workspace_id, query_vector, top_k, document_ids=document_ids, nprobe=nprobe)
+
+
+def _hybrid_candidates(
     db: Session,
     workspace_id: int,
     query: str,
     top_k: int,
-    document_ids: list[int] | None = None,
-) -> list[dict]:
-    query_tokens = _tokenize(query)
-    if not query_tokens:
+    document_ids: list[int] | None,
+    nprobe: int | None = None,
+) -> list[tuple[float, int]]:
+    pool_size = max(top_k, settings.ai_hybrid_candidate_pool)
+    vector_future = _vector_pool.submit(
+        _vector_candidates, workspace_id, query, pool_size, document_ids, nprobe
+    )
+    lexical = _lexical_candidates(db, workspace_id, query, pool_size, document_ids)
+    vector = vector_future.result()
+    return fuse_rankings(
+        [lexical, vector],
+        top_k,
+        weights=[settings.ai_hybrid_lexical_weight, settings.ai_hybrid_vector_weight],
+        rrf_k=settings.ai_hybrid_rrf_k,
+    )
+
+
+def _hydrate(db: Session, winners: list[tuple[float, int]], top_k: int) -> list[dict]:
+    if not winners:
         return []
 
-    stmt = (
-        select(DocumentChunk, Document)
+    # Only the winners pay for loading chunk text and document metadata.
+    rows = db.execute(
+        select(
+            DocumentChunk.id,
+            DocumentChunk.content,
+            DocumentChunk.start_offset,
+            DocumentChunk.end_offset,
+            Document.id.label("document_id"),
+            Document.workspace_id,
+            Document.filename,
+            Document.source_type,
+        )
         .join(Document, Document.id == DocumentChunk.document_id)
         .where(
-            DocumentChunk.workspace_id == workspace_id,
+            DocumentChunk.id.in_([chunk_id for _, chunk_id in winners]),
             Document.status == DocumentStatus.INDEXED,
         )
-    )
-    if document_ids:
-        stmt = stmt.where(Document.id.in_(document_ids))
-
-    rows = db.execute(stmt).all()
-    scored: list[dict] = []
-    for chunk, document in rows:
-        chunk_tokens = _tokenize(chunk.content)
-        overlap = query_tokens & chunk_tokens
-        if not overlap:
+    ).all()
+    by_id = {row.id: row for row in rows}
+
+    results: list[dict] = []
+    for score, chunk_id in winners:
+        row = by_id.get(chunk_id)
+        if row is None:
             continue
-        score = len(overlap) / max(len(query_tokens), 1)
-        scored.append(
+        results.append(
             {
-                "chunk_id": chunk.id,
-                "document_id": document.id,
-                "filename": document.filename,
-                "content": chunk.content,
+                "chunk_id": row.id,
+                "document_id": row.document_id,
+                "filename": row.filename,
+                "content": row.content,
+                "start_offset": row.start_offset,
+                "end_offset": row.end_offset,
                 "score": round(score, 4),
-                "metadata": chunk.metadata_json or {},
+                "metadata": {
+                    "workspace_id": row.workspace_id,
+                    "document_id": row.document_id,
+                    "source": row.source_type.value,
+                    "filename": row.filename,
+                },
             }
         )
-    return rerank_chunks(scored)[:top_k]
+    return rerank_chunks(results, top_k)
+
+
+def _retrieve_uncached(
+    db: Session,
+    workspace_id: int,
+    query: str,
+    top_k: int,
+    document_ids: list[int] | None,
+    mode: str,
+    nprobe: int | None,
+) -> list[dict]:
+    if document_ids:
+        document_ids = resolve_document_ids(db, workspace_id, document_ids)
+    # nprobe only matters once a workspace is large enough to be served by the IVF index.
+    if mode == "vector":
+        winners = _vector_candidates(workspace_id, query, top_k, document_ids, nprobe=nprobe)
+    elif mode == "hybrid":
+        winners = _hybrid_candidates(db, workspace_id, query, top_k, document_ids, nprobe=nprobe)
+    elif mode == "lexical":
+        winners = _lexical_candidates(db, workspace_id, query, top_k, document_ids)
+    else:
+        raise ValueError(f"Unsupported retrieval mode: {mode}")
+    return _hydrate(db, winners, top_k)
+
+
+def retrieve_workspace_chunks(
+    db: Session,
+    workspace_id: int,
+    query: str,
+    top_k: int,
+    document_ids: list[int] | None = None,
+    nprobe: int | None = None,
+) -> list[dict]:
+    # The index version is bumped on every ingest, so cached results can never outlive the data they came from.
+    mode = settings.ai_retrieval_mode.lower()
+    key = retrieval_key(
+        workspace_id,
+        get_index_version(workspace_id),
+        query,
+        top_k,
+        document_ids,
+        f"{mode}:{nprobe or ''}",
+    )
+    cached = _local_cache.get(key)
+    if cached is None:
+        cached = cache_get_json(key)
+        if cached is not None:
+            _local_cache.set(key, cached)
+    if cached is not None:
+        metrics.incr("rag_retrieval_cache_hits")
+        return [dict(item) for item in cached]
+
+    metrics.incr("rag_retrieval_cache_misses")
+    results = _retrieve_uncached(db, workspace_id, query, top_k, document_ids, mode, nprobe)
+    cache_set_json(key, results, settings.ai_retrieval_cache_ttl_seconds)
+    _local_cache.set(key, results)
+    return [dict(item) for item in results]
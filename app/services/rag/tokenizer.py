@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from functools import lru_cache
+import hashlib
+import math
+import os
+from pathlib import Path
+import re
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# GPT-style pre-tokenization: a leading space stays attached to the following word, digits group in threes,
+# and every CJK/kana/hangul character is its own piece.
+PIECE_PATTERN = re.compile(
+    r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]"
+    r"| ?[A-Za-z]+"
+    r"| ?\d{1,3}"
+    r"| ?[^\W\d_]+"
+    r"| ?[^\s\w]+"
+    r"|\s+"
+)
+PIECE_CACHE_SIZE = 200_000
+# tiktoken caches a downloaded encoding under TIKTOKEN_CACHE_DIR as the SHA-1 of its source URL.
+TIKTOKEN_BLOB_URL = "https://openaipublic.blob.core.windows.net/encodings/{name}.tiktoken"
+
+
+def _prefetched_encoding(name: str) -> Path | None:
+    cache_dir = os.environ.get("TIKTOKEN_CACHE_DIR")
+    if not cache_dir:
+        return None
+    path = Path(cache_dir) / hashlib.sha1(TIKTOKEN_BLOB_URL.format(name=name).encode()).hexdigest()
+    return path if path.exists() else None
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    # tiktoken is optional: with it counts are exact for AI_TOKENIZER_ENCODING, without it the heuristic below
+    # estimates them. tiktoken would download a missing encoding on first use, so only one pre-fetched into
+    # TIKTOKEN_CACHE_DIR (the Docker image does this at build time) is loaded; a request never waits on it.
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    name = settings.ai_tokenizer_encoding
+    if _prefetched_encoding(name) is None:
+        logger.warning("Tokenizer %s is not pre-fetched into TIKTOKEN_CACHE_DIR, estimating token counts", name)
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as exc:
+        logger.warning("Tokenizer %s unavailable, estimating token counts: %s", name, exc)
+        return None
+
+
+def warm_tokenizer() -> None:
+    # Parsing the encoding takes a moment; doing it at startup keeps it off the first request.
+    _encoding()
+
+
+@lru_cache(maxsize=PIECE_CACHE_SIZE)
+def _piece_cost(piece: str) -> int:
+    # Approximates the merge depth of a byte-level BPE vocabulary: short common pieces are one token,
+    # long words split roughly every five characters, and non-Latin letters every two.
+    word = piece.lstrip(" ")
+    if not word or word.isspace():
+        return 1
+    if word.isascii() and word.isalpha():
+        return 1 if len(word) <= 7 else 1 + math.ceil((len(word) - 7) / 5)
+    if word.isdigit() or len(word) == 1:
+        return 1
+    return math.ceil(len(word) / 2)
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # Repeated pieces (" the", ",", "\n\n") hit the memoized vocabulary instead of being re-scored.
+    return sum(_piece_cost(match.group()) for match in PIECE_PATTERN.finditer(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        # A cut can land inside a multi-byte character; its partial bytes are dropped.
+        return encoding.decode_bytes(tokens[:max_tokens]).decode("utf-8", errors="ignore").rstrip()
+    used = 0
+    end = 0
+    for match in PIECE_PATTERN.finditer(text):
+        used += _piece_cost(match.group())
+        if used > max_tokens:
+            break
+        end = match.end()
+    return text[:end].rstrip()
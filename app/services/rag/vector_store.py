@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.services.rag.ann import (
+    IVFIndex,
+    assign_lists,
+    build_ivf,
+    choose_list_count,
+    probe_rows,
+    train_centroids,
+)
+
+VECTOR_LOCK_TIMEOUT_SECONDS = 300
+MANIFEST_FILE = "manifest.json"
+
+# Append-only column files per generation; compaction writes a new generation.
+VECTORS = ("vectors", np.float32)
+CHUNK_IDS = ("chunk_ids", np.int64)
+DOCUMENT_IDS = ("document_ids", np.int64)
+TOMBSTONES = ("tombstones", np.int64)
+IVF_LISTS = ("ivf_lists", np.int32)
+
+
+@dataclass
+class WorkspaceVectors:
+    # Row i of `vectors` belongs to chunk_ids[i] / document_ids[i]; vectors are L2-normalized float32.
+    vectors: np.ndarray
+    chunk_ids: np.ndarray
+    document_ids: np.ndarray
+    live: np.ndarray
+    ivf: IVFIndex | None
+    manifest: dict
+    mtime_ns: int = 0
+
+    @property
+    def live_count(self) -> int:
+        return int(self.live.sum())
+
+
+_cache: dict[int, WorkspaceVectors] = {}
+_cache_lock = threading.Lock()
+
+
+def workspace_vector_dir(workspace_id: int) -> Path:
+    return Path(settings.ai_storage_dir) / "vectors" / f"ws_{workspace_id}"
+
+
+def _new_manifest(generation: int = 0) -> dict:
+    return {
+        "dim": settings.ai_embedding_dim,
+        "generation": generation,
+        "rows": 0,
+        "tombstones": 0,
+        "ivf_rows": 0,
+    }
+
+
+def _read_manifest(directory: Path) -> dict:
+    path = directory / MANIFEST_FILE
+    if not path.exists():
+        return _new_manifest()
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _write_manifest(directory: Path, manifest: dict) -> None:
+    tmp_path = directory / f".{MANIFEST_FILE}.tmp"
+    tmp_path.write_text(json.dumps(manifest), encoding="utf-8")
+    tmp_path.replace(directory / MANIFEST_FILE)
+
+
+def _column_path(directory: Path, manifest: dict, column: tuple[str, type]) -> Path:
+    return directory / f"{column[0]}.{manifest['generation']}.bin"
+
+
+def _open_column(directory: Path, manifest: dict, column: tuple[str, type], rows: int, width: int = 0) -> np.ndarray:
+    shape = (rows, width) if width else (rows,)
+    if rows == 0:
+        return np.zeros(shape, dtype=column[1])
+    # Memory-mapped: pages are shared across workers and only touched rows are read.
+    return np.memmap(_column_path(directory, manifest, column), dtype=column[1], mode="r", shape=shape)
+
+
+def _append_column(directory: Path, manifest: dict, column: tuple[str, type], rows: int, values: np.ndarray) -> None:
+    path = _column_path(directory, manifest, column)
+    values = np.ascontiguousarray(values, dtype=column[1])
+    row_bytes = values.itemsize * (values.shape[1] if values.ndim == 2 else 1)
+    with path.open("ab") as handle:
+        # Drop any tail left behind by a writer that crashed before updating the manifest.
+        handle.truncate(rows * row_bytes)
+        handle.write(values.tobytes())
+
+
+def load_workspace_vectors(workspace_id: int) -> WorkspaceVectors:
+    directory = workspace_vector_dir(workspace_id)
+    manifest_path = directory / MANIFEST_FILE
+    mtime_ns = manifest_path.stat().st_mtime_ns if manifest_path.exists() else 0
+    with _cache_lock:
+        cached = _cache.get(workspace_id)
+        if cached is not None and cached.mtime_ns == mtime_ns:
+            return cached
+
+    manifest = _read_manifest(directory)
+    rows, dim = manifest["rows"], manifest["dim"]
+    live = np.ones(rows, dtype=bool)
+    tombstones = _open_column(directory, manifest, TOMBSTONES, manifest["tombstones"])
+    live[np.asarray(tombstones)] = False
+
+    ivf = None
+    if manifest["ivf_rows"]:
+        lists = np.asarray(_open_column(directory, manifest, IVF_LISTS, rows))
+        centroids = np.load(directory / f"ivf_centroids.{manifest['generation']}.npy")
+        ivf = build_ivf(centroids, lists)
+
+    loaded = WorkspaceVectors(
+        vectors=_open_column(directory, manifest, VECTORS, rows, dim),
+        chunk_ids=_open_column(directory, manifest, CHUNK_IDS, rows),
+        document_ids=np.asarray(_open_column(directory, manifest, DOCUMENT_IDS, rows)),
+        live=live,
+        ivf=ivf,
+        manifest=manifest,
+        mtime_ns=mtime_ns,
+    )
+    with _cache_lock:
+        _cache[workspace_id] = loaded
+    return loaded
+
+
+def _compact(directory: Path, data: WorkspaceVectors) -> dict:
+    manifest = _new_manifest(data.manifest["generation"] + 1)
+    keep = np.flatnonzero(data.live)
+    _append_column(directory, manifest, VECTORS, 0, data.vectors[keep])
+    _append_column(directory, manifest, CHUNK_IDS, 0, data.chunk_ids[keep])
+    _append_column(directory, manifest, DOCUMENT_IDS, 0, data.document_ids[keep])
+    manifest["rows"] = len(keep)
+    if data.ivf is not None:
+        _append_column(directory, manifest, IVF_LISTS, 0, data.ivf.lists[keep])
+        np.save(directory / f"ivf_centroids.{manifest['generation']}.npy", data.ivf.centroids)
+        manifest["ivf_rows"] = data.manifest["ivf_rows"]
+    return manifest
+
+
+def _train(directory: Path, data: WorkspaceVectors, manifest: dict) -> None:
+    live_rows = np.flatnonzero(data.live)
+    centroids = train_centroids(data.vectors, live_rows, choose_list_count(len(live_rows)))
+    lists = assign_lists(data.vectors, centroids)
+    # Readers may still map the current lists file, so the retrained one is swapped in by rename.
+    for path, writer in (
+        (_column_path(directory, manifest, IVF_LISTS), lambda handle: handle.write(lists.tobytes())),
+        (directory / f"ivf_centroids.{manifest['generation']}.npy", lambda handle: np.save(handle, centroids)),
+    ):
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with tmp_path.open("wb") as handle:
+            writer(handle)
+        tmp_path.replace(path)
+    manifest["ivf_rows"] = len(live_rows)
+
+
+def _cleanup_generations(directory: Path, generation: int) -> None:
+    for path in directory.iterdir():
+        parts = path.name.split(".")
+        if len(parts) >= 3 and parts[1].isdigit() and int(parts[1]) < generation:
+            path.unlink(missing_ok=True)
+
+
+def replace_document_vectors(
+    workspace_id: int,
+    document_id: int,
+    chunk_ids: list[int],
+    vectors: np.ndarray,
+) -> None:
+    update_document_vectors(workspace_id, document_id, None, chunk_ids, vectors)
+
+
+def update_document_vectors(
+    workspace_id: int,
+    document_id: int,
+    removed_chunk_ids: list[int] | None,
+    chunk_ids: list[int],
+    vectors: np.ndarray,
+) -> None:
+    # removed_chunk_ids=None tombstones every live row of the document.
+    directory = workspace_vector_dir(workspace_id)
+    with redis_client.lock(f"lock:rag:vectors:ws:{workspace_id}", timeout=VECTOR_LOCK_TIMEOUT_SECONDS):
+        directory.mkdir(parents=True, exist_ok=True)
+        current = load_workspace_vectors(workspace_id)
+        manifest = dict(current.manifest)
+        rows = manifest["rows"]
+
+        # Deletes are tombstones; the rows stay on disk until the next compaction.
+        stale = current.live & (current.document_ids == document_id)
+        if removed_chunk_ids is not None:
+            stale &= np.isin(current.chunk_ids, removed_chunk_ids)
+        stale_rows = np.flatnonzero(stale)
+        if len(stale_rows):
+            _append_column(directory, manifest, TOMBSTONES, manifest["tombstones"], stale_rows)
+            manifest["tombstones"] += len(stale_rows)
+
+        if len(chunk_ids):
+            vectors = np.asarray(vectors, dtype=np.float32)
+            _append_column(directory, manifest, VECTORS, rows, vectors)
+            _append_column(directory, manifest, CHUNK_IDS, rows, np.asarray(chunk_ids, dtype=np.int64))
+            _append_column(directory, manifest, DOCUMENT_IDS, rows, np.full(len(chunk_ids), document_id))
+            if current.ivf is not None:
+                _append_column(directory, manifest, IVF_LISTS, rows, assign_lists(vectors, current.ivf.centroids))
+            manifest["rows"] = rows + len(chunk_ids)
+
+        _write_manifest(directory, manifest)
+        data = load_workspace_vectors(workspace_id)
+
+        if manifest["tombstones"] > settings.ai_vector_compact_ratio * max(manifest["rows"], 1):
+            manifest = _compact(directory, data)
+            _write_manifest(directory, manifest)
+            _cleanup_generations(directory, manifest["generation"])
+            data = load_workspace_vectors(workspace_id)
+
+        # (Re)train once the workspace crosses the ANN threshold, and again whenever it doubles.
+        live_count = data.live_count
+        if live_count >= settings.ai_ann_min_vectors and live_count >= 2 * manifest["ivf_rows"]:
+            manifest = dict(data.manifest)
+            _train(directory, data, manifest)
+            _write_manifest(directory, manifest)
+
+
+def remove_document_vectors(workspace_id: int, document_id: int) -> None:
+    replace_document_vectors(
+        workspace_id,
+        document_id,
+        [],
+        np.zeros((0, settings.ai_embedding_dim), dtype=np.float32),
+    )
+
+
+def search_vectors(
+    workspace_id: int,
+    query_vector: np.ndarray,
+    top_k: int,
+    document_ids: list[int] | None = None,
+    nprobe: int | None = None,
+) -> list[tuple[float, int]]:
+    data = load_workspace_vectors(workspace_id)
+    if data.live_count == 0 or top_k <= 0:
+        return []
+    query_vector = query_vector.astype(np.float32, copy=False)
+
+    if document_ids:
+        # Filtered: the documents' own rows are few, so they are scored exactly. Probing IVF lists first would
+        # drop every row of the filter that happens to sit outside the nprobe closest lists.
+        rows = np.flatnonzero(data.live & np.isin(data.document_ids, document_ids))
+        if rows.size == 0:
+            return []
+        scores = np.asarray(data.vectors[rows]) @ query_vector
+    elif data.ivf is not None and data.live_count >= settings.ai_ann_min_vectors:
+        # Approximate: score only the rows in the nprobe closest lists (higher nprobe, higher recall).
+        rows = np.sort(probe_rows(data.ivf, query_vector, nprobe or settings.ai_ann_nprobe))
+        rows = rows[data.live[rows]]
+        if rows.size == 0:
+            return []
+        scores = np.asarray(data.vectors[rows]) @ query_vector
+    else:
+        # Exact: one BLAS matrix-vector product scores the whole workspace.
+        scores = np.where(data.live, np.asarray(data.vectors) @ query_vector, -np.inf)
+        rows = np.arange(len(scores))
+
+    k = min(top_k, len(scores))
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [
+        (float(scores[index]), int(data.chunk_ids[rows[index]]))
+        for index in candidates
+        if np.isfinite(scores[index]) and scores[index] > 0
+    ]
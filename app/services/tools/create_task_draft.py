@@ -3,6 +3,7 @@ from __future__ import annotations
 from sqlalchemy.orm import Session
 
 from app.services.llm.client import get_llm_provider
+from app.services.rag.context import pack_contexts
 from app.services.rag.retriever import retrieve_workspace_chunks
 
 
@@ -20,8 +21,8 @@ def create_task_draft(
         top_k=3,
         document_ids=document_ids,
     )
-    provider = get_llm_provider()
-    drafts = provider.draft_tasks(requirement, contexts)
+    provider = get_llm_provider(workspace_id)
+    drafts = provider.draft_tasks(requirement, pack_contexts(contexts))
     return {
         "tool_name": "create_task_draft",
         "summary": f"Generated {len(drafts)} task drafts for project {project_id}.",
@@ -0,0 +1,122 @@
+"""LLM transport against a local OpenAI-compatible stub: retries, streaming and single-flight."""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import fakeredis
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import pytest
+import uvicorn
+
+from app.core.config import settings
+from app.services.llm import singleflight
+from app.services import cache
+from app.services.llm.cached import CachedLLMProvider
+from app.services.llm.http import LLMEndpoint, LLMProviderError, close_llm_transport, post_json
+from app.services.llm.providers import OpenAICompatibleProvider
+
+CONTEXTS = [{"chunk_id": 1, "filename": "spec.md", "content": "Refunds are issued within 14 days."}]
+
+
+def _stub_app(state: dict) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        state["calls"] += 1
+        if state["rate_limited"] > 0:
+            state["rate_limited"] -= 1
+            return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "0"})
+        if state["malformed"]:
+            return PlainTextResponse("<html>upstream gateway page</html>")
+        if body.get("stream"):
+            async def events():
+                for piece in ["Refunds", " take", " 14 days."]:
+                    yield "data: " + json.dumps({"choices": [{"delta": {"content": piece}}]}) + "\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+        await asyncio.sleep(state["delay"])
+        return {"choices": [{"message": {"content": f"answer #{state['calls']}"}}]}
+
+    return app
+
+
+@pytest.fixture(scope="module")
+def stub():
+    state = {"calls": 0, "rate_limited": 0, "delay": 0.0, "malformed": False}
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(_stub_app(state), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield state, LLMEndpoint(base_url=f"http://127.0.0.1:{port}/v1")
+    close_llm_transport()
+    server.should_exit = True
+    thread.join()
+
+
+@pytest.fixture(autouse=True)
+def isolated(stub, monkeypatch):
+    state, _ = stub
+    state.update(calls=0, rate_limited=0, delay=0.0, malformed=False)
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(cache, "redis_client", redis)
+    monkeypatch.setattr(singleflight, "redis_client", redis)
+    monkeypatch.setattr(settings, "llm_retry_backoff_seconds", 0.01)
+
+
+def test_post_json_retries_rate_limited_requests(stub):
+    state, endpoint = stub
+    state["rate_limited"] = 2
+    data = post_json("/chat/completions", {"model": "stub", "messages": []}, endpoint)
+    assert data["choices"][0]["message"]["content"] == "answer #3"
+    assert state["calls"] == 3
+
+
+def test_post_json_wraps_non_json_success_responses(stub):
+    state, endpoint = stub
+    state["malformed"] = True
+    with pytest.raises(LLMProviderError, match="malformed"):
+        post_json("/chat/completions", {"model": "stub", "messages": []}, endpoint)
+
+
+def test_post_json_wraps_transport_errors():
+    # Nothing listens on the reserved port: every attempt fails to connect and the last one is wrapped.
+    with pytest.raises(LLMProviderError, match="LLM request failed"):
+        post_json("/chat/completions", {"model": "stub", "messages": []}, LLMEndpoint(base_url="http://127.0.0.1:9/v1"))
+
+
+def test_stream_answer_yields_deltas_in_order(stub):
+    _, endpoint = stub
+    provider = OpenAICompatibleProvider("stub", endpoint)
+
+    async def collect():
+        return [piece async for piece in provider.stream_answer("How long do refunds take?", CONTEXTS)]
+
+    assert asyncio.run(collect()) == ["Refunds", " take", " 14 days."]
+
+
+def test_identical_concurrent_calls_share_one_upstream_request(stub):
+    state, endpoint = stub
+    state["delay"] = 0.3
+    provider = CachedLLMProvider(OpenAICompatibleProvider("stub", endpoint), "stub:test", workspace_id=1)
+    answers: list[str] = []
+    threads = [
+        threading.Thread(target=lambda: answers.append(provider.generate_answer("Refund window?", CONTEXTS)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert state["calls"] == 1
+    assert answers == ["answer #1"] * 8